@@ -0,0 +1,385 @@
+'''Load test of the application.
+
+Seeds a temporary SQLite database with synthetic users, boards, columns,
+tasks and memberships, a few very large boards shared with many users among
+them, then has concurrent clients drive a mix of the application's routes
+through the flask test client. Nothing leaves the process.
+
+The report gives, for each kind of request, the throughput, the latency
+percentiles and the number of SQL statements per request. It is written as
+JSON, to stdout or to --output, so that runs on two commits can be diffed,
+and summed up on stderr:
+
+    cd back && python benchmark.py --users 100 --concurrency 8 --output a.json
+'''
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+PASSWORD = 'benchmark'
+WORDS = ('alpha bravo charlie delta echo foxtrot golf hotel india juliet '
+         'kilo lima mike november oscar papa quebec romeo sierra tango '
+         'uniform victor whiskey xray yankee zulu report review deploy '
+         'design release budget meeting invoice backup cleanup').split()
+
+# Kind of request: weight in the mix
+MIX = {'view_board': 30,
+       'view_board_unchanged': 15,
+       'dashboard': 10,
+       'tasks_page': 5,
+       'skeleton': 2,
+       'search': 8,
+       'add_task': 15,
+       'move_task': 10,
+       'delete_task': 5}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--boards-per-user', type=int, default=4)
+    parser.add_argument('--columns-per-board', type=int, default=5)
+    parser.add_argument('--tasks-per-column', type=int, default=20)
+    parser.add_argument('--shared-ratio', type=float, default=0.5,
+                        help='share of the boards having other members')
+    parser.add_argument('--members-per-board', type=int, default=5)
+    parser.add_argument('--large-boards', type=int, default=2)
+    parser.add_argument('--large-board-tasks', type=int, default=5000)
+    parser.add_argument('--large-board-members', type=float, default=0.5,
+                        help='share of the users member of each large board')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=250,
+                        help='requests sent by each client')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--profile', default=None,
+                        help='configuration profile, see config.py')
+    parser.add_argument('--output', help='file to write the JSON report to')
+    return parser.parse_args(argv)
+
+
+# ##########################- Synthetic data -################################
+
+def seed(options, rng):
+    '''Fill the database and return, for every user, the boards the user
+       can see as {'name', 'editable', 'large', 'columns': [(id, name)]}.'''
+    from database import DATABASE as db
+    from hashing import PASSWORD_HASHER
+    from models.columns import Columns
+    from models.members import Members
+    from models.tables import Tables
+    from models.tasks import Tasks
+    from models.users import Users
+    from ranking import spread
+
+    password_hash = PASSWORD_HASHER.hash(PASSWORD)
+    emails = ['user{}@bench.local'.format(i) for i in range(options.users)]
+    users = [{'email': email, 'username': email.split('@')[0],
+              'password_hash': password_hash} for email in emails]
+    tables, members, columns, tasks = [], [], [], []
+    visible = {email: [] for email in emails}
+
+    def add_board(name, creator, shared_with, task_count):
+        table_id = len(tables) + 1
+        tables.append({'id': table_id, 'name': name, 'creator': creator,
+                       'shared': bool(shared_with), 'version': 0})
+        board_columns = []
+
+        for position in spread(options.columns_per_board):
+            column_id = len(columns) + 1
+            column_name = 'column-{}'.format(len(board_columns))
+            columns.append({'id': column_id, 'name': column_name,
+                            'table_id': table_id, 'position': position})
+            board_columns.append((column_id, column_name))
+
+        per_column = task_count // max(len(board_columns), 1)
+
+        for column_id, _ in board_columns:
+            for position in spread(per_column):
+                tasks.append({'id': len(tasks) + 1,
+                              'description': ' '.join(rng.sample(WORDS, 4)),
+                              'column_id': column_id, 'position': position})
+
+        large = task_count > options.columns_per_board * options.tasks_per_column
+        visible[creator].append({'name': name, 'editable': True,
+                                 'large': large, 'columns': board_columns})
+
+        if shared_with:
+            members.append({'table_id': table_id, 'user_id': creator,
+                            'role': 'creator'})
+
+        for email, role in shared_with:
+            members.append({'table_id': table_id, 'user_id': email,
+                            'role': role})
+            visible[email].append({'name': name, 'large': large,
+                                   'editable': role != 'visitor',
+                                   'columns': board_columns})
+
+    for creator in emails:
+        others = [email for email in emails if email != creator]
+
+        for _ in range(options.boards_per_user):
+            shared_with = []
+
+            if others and rng.random() < options.shared_ratio:
+                chosen = rng.sample(others, min(options.members_per_board,
+                                                len(others)))
+                shared_with = [(email, rng.choice(('admin', 'editor', 'editor',
+                                                   'visitor')))
+                               for email in chosen]
+            add_board('board-{}'.format(len(tables) + 1), creator, shared_with,
+                      options.columns_per_board * options.tasks_per_column)
+
+    for index in range(options.large_boards):
+        creator = emails[index % len(emails)]
+        others = [email for email in emails if email != creator]
+        chosen = rng.sample(others, int(len(others) * options.large_board_members))
+        add_board('large-{}'.format(index + 1), creator,
+                  [(email, 'editor') for email in chosen],
+                  options.large_board_tasks)
+
+    for model, rows in ((Users, users), (Tables, tables), (Members, members),
+                        (Columns, columns), (Tasks, tasks)):
+        for start in range(0, len(rows), 5000):
+            db.session.bulk_insert_mappings(model, rows[start:start + 5000])
+    db.session.commit()
+
+    return visible, {'users': len(users), 'tables': len(tables),
+                     'members': len(members), 'columns': len(columns),
+                     'tasks': len(tasks)}
+
+
+# ##########################- Requests -######################################
+
+class Client:
+    '''A logged in user sending a random mix of requests.'''
+
+    def __init__(self, app, email, boards, rng):
+        self.http = app.test_client()
+        self.email = email
+        self.boards = boards
+        self.editable = [board for board in boards if board['editable']]
+        self.rng = rng
+        self.etags = {}
+        self.added = []
+        response = self.http.post('/login/', json={'email': email,
+                                                   'password': PASSWORD})
+
+        if response.get_json()['error']:
+            raise RuntimeError("Could not log {} in".format(email))
+
+    def pick_board(self, boards):
+        '''Return a board among boards, the large ones being popular.'''
+        large = [board for board in boards if board['large']]
+
+        if large and self.rng.random() < 0.2:
+            return self.rng.choice(large)
+        return self.rng.choice(boards)
+
+    def send(self, kind):
+        '''Send a request of the kind, or of another kind if the user can't,
+           and return the kind actually sent along with the response.'''
+        if not self.boards and kind not in ('dashboard', 'search'):
+            kind = 'dashboard'
+        elif not self.editable and kind in ('add_task', 'move_task',
+                                            'delete_task'):
+            kind = 'view_board'
+        elif not self.added and kind in ('move_task', 'delete_task'):
+            kind = 'add_task'
+        return kind, getattr(self, kind)()
+
+    def view_board(self):
+        board = self.pick_board(self.boards)
+        response = self.http.get('/tables/' + board['name'])
+        self.etags[board['name']] = response.headers.get('ETag')
+        return response
+
+    def view_board_unchanged(self):
+        board = self.pick_board(self.boards)
+        etag = self.etags.get(board['name'])
+        headers = {'If-None-Match': etag} if etag else {}
+        response = self.http.get('/tables/' + board['name'], headers=headers)
+        self.etags[board['name']] = response.headers.get('ETag')
+        return response
+
+    def dashboard(self):
+        return self.http.get('/tables/dashboard/')
+
+    def tasks_page(self):
+        board = self.pick_board(self.boards)
+        column_id, _ = self.rng.choice(board['columns'])
+        return self.http.get('/tables/{}/columns/{}/tasks/?limit=50'
+                             .format(board['name'], column_id))
+
+    def skeleton(self):
+        board = self.pick_board(self.boards)
+        return self.http.get('/tables/{}?skeleton=1'.format(board['name']))
+
+    def search(self):
+        return self.http.get('/tables/search/?q={}'
+                             .format(self.rng.choice(WORDS)[:4]))
+
+    def add_task(self):
+        board = self.pick_board(self.editable)
+        column = self.rng.choice(board['columns'])
+        response = self.http.post(
+            '/tables/{}/columns/{}/add-task/?response=delta'
+            .format(board['name'], column[1]),
+            json={'description': ' '.join(self.rng.sample(WORDS, 4))})
+        body = response.get_json()
+
+        if body and not body.get('error'):
+            self.added.append((board, column, body['data']['id']))
+        return response
+
+    def move_task(self):
+        index = self.rng.randrange(len(self.added))
+        board, column, task_id = self.added[index]
+        destination = self.rng.choice(board['columns'])
+        response = self.http.post(
+            '/tables/{}/columns/{}/tasks/task/{}/move/?response=delta'
+            .format(board['name'], column[0], task_id),
+            json={'move_to': destination[1]})
+        self.added[index] = (board, destination, task_id)
+        return response
+
+    def delete_task(self):
+        board, column, task_id = self.added.pop(
+            self.rng.randrange(len(self.added)))
+        return self.http.get(
+            '/tables/{}/columns/{}/delete-task/{}?response=delta'
+            .format(board['name'], column[1], task_id))
+
+
+def run_client(client, count, kinds, weights, samples, counter):
+    '''Send count requests and add (kind, seconds, queries, ok) to samples.'''
+    for kind in client.rng.choices(kinds, weights, k=count):
+        counter.queries = 0
+        started = time.perf_counter()
+        kind, response = client.send(kind)
+        elapsed = time.perf_counter() - started
+        ok = response.status_code < 400
+
+        if ok and response.is_json:
+            ok = not (response.get_json() or {}).get('error')
+        samples.append((kind, elapsed, counter.queries, ok))
+
+
+# ##########################- Report -########################################
+
+def percentile(values, fraction):
+    '''Return the nearest-rank percentile of the sorted values.'''
+    index = max(int(round(fraction * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def summarize(samples, duration):
+    '''Return the statistics of the samples, by kind of request and overall.'''
+    by_kind = {}
+
+    for sample in samples:
+        by_kind.setdefault(sample[0], []).append(sample)
+    by_kind['all'] = samples
+    report = {}
+
+    for kind, kind_samples in sorted(by_kind.items()):
+        latencies = sorted(sample[1] * 1000 for sample in kind_samples)
+        queries = [sample[2] for sample in kind_samples]
+        report[kind] = {
+            'requests': len(kind_samples),
+            'errors': sum(1 for sample in kind_samples if not sample[3]),
+            'throughput_rps': round(len(kind_samples) / duration, 1),
+            'latency_ms': {'mean': round(sum(latencies) / len(latencies), 2),
+                           'p50': round(percentile(latencies, 0.50), 2),
+                           'p95': round(percentile(latencies, 0.95), 2),
+                           'p99': round(percentile(latencies, 0.99), 2),
+                           'max': round(latencies[-1], 2)},
+            'queries': {'mean': round(sum(queries) / len(queries), 2),
+                        'max': max(queries)}}
+    return report
+
+
+def print_summary(report, out=sys.stderr):
+    print('{:<22}{:>9}{:>8}{:>9}{:>9}{:>9}{:>9}{:>9}'.format(
+        'request', 'count', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms',
+        'queries'), file=out)
+
+    for kind, stats in report['endpoints'].items():
+        latency = stats['latency_ms']
+        print('{:<22}{:>9}{:>8}{:>9}{:>9}{:>9}{:>9}{:>9}'.format(
+            kind, stats['requests'], stats['errors'], stats['throughput_rps'],
+            latency['p50'], latency['p95'], latency['p99'],
+            stats['queries']['mean']), file=out)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    directory = tempfile.mkdtemp(prefix='trello-benchmark-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory,
+                                                            'benchmark.db')
+
+    if options.profile:
+        os.environ['TRELLO_CONFIG'] = options.profile
+
+    # The application is created on import, from the environment set above
+    import server
+    from database import DATABASE
+    from sqlalchemy import event
+
+    app = server.app
+    rng = random.Random(options.seed)
+
+    with app.app_context():
+        started = time.perf_counter()
+        visible, seeded = seed(options, rng)
+        seeded['seconds'] = round(time.perf_counter() - started, 2)
+        engine = DATABASE.get_engine(app)
+
+    counter = threading.local()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_query(*args):
+        counter.queries = getattr(counter, 'queries', 0) + 1
+
+    emails = sorted(visible)
+    clients = [Client(app, emails[index % len(emails)],
+                      visible[emails[index % len(emails)]],
+                      random.Random(options.seed * 1000 + index))
+               for index in range(options.concurrency)]
+    kinds, weights = list(MIX), list(MIX.values())
+    samples = []
+    threads = [threading.Thread(target=run_client,
+                                args=(client, options.requests, kinds, weights,
+                                      samples, counter))
+               for client in clients]
+    started = time.perf_counter()
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    report = {'options': vars(options),
+              'seeded': seeded,
+              'duration_seconds': round(duration, 2),
+              'endpoints': summarize(samples, duration)}
+    output = json.dumps(report, indent=2, sort_keys=True)
+
+    if options.output:
+        with open(options.output, 'w') as out:
+            out.write(output + '\n')
+    else:
+        print(output)
+    print_summary(report)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
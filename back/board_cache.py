@@ -0,0 +1,103 @@
+'''Bounded in-process cache of serialized boards.
+
+Every member of a shared board gets the same serialized board, only the
+'current_user_role' field differs. The cache keeps the serialized board
+without that field, for the current version of the table only, and the
+role of the user is spliced in when answering. Each representation of a
+board, see REPRESENTATIONS, is cached on its own.'''
+import json
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+REPRESENTATIONS = ('full', 'compact')
+
+
+class BoardCache:
+    '''Least recently used boards are evicted once the cached bodies exceed
+       the byte budget.'''
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        '''Read the byte budget from the application's configuration.'''
+        self.max_bytes = app.config.get('BOARD_CACHE_BYTES', DEFAULT_MAX_BYTES)
+
+    def get(self, table_id, version, representation='full'):
+        '''Return the cached body of the table at version, or None.'''
+        key = (table_id, representation)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, table_id, version, body, representation='full'):
+        '''Cache the body of the table at version and return it.'''
+        body = body.encode('utf-8') if isinstance(body, str) else body
+        key = (table_id, representation)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] > version:
+                return body
+            self._remove(key)
+
+            if len(body) <= self.max_bytes:
+                self._entries[key] = (version, body)
+                self.size += len(body)
+
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return body
+
+    def invalidate(self, table_id):
+        '''Forget the table, called whenever it changes.'''
+        with self._lock:
+            for representation in REPRESENTATIONS:
+                self._remove((table_id, representation))
+
+    def clear(self):
+        '''Forget every board.'''
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        '''Return the cache counters.'''
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'bytes': self.size,
+                    'max_bytes': self.max_bytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+def with_role(body, role):
+    '''Return the cached body with the user's role added to it.'''
+    return b''.join((b'{"current_user_role":', json.dumps(role).encode('utf-8'),
+                     b',' if len(body) > 2 else b'', body[1:]))
+
+
+BOARD_CACHE = BoardCache()
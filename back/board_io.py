@@ -0,0 +1,365 @@
+'''Export and import of whole boards as newline-delimited JSON.
+
+An export is one JSON object per line, each with a 'type':
+
+    table   "format": 1, "id", "name", "creator", "shared", "version"
+    member  "id", "email", "role", for every member
+    column  "id", "name", "position", for every column, followed by
+    task    "id", "column_id", "description", "position", for its tasks
+
+The table comes first and every column before its tasks. Exports are read
+from a single snapshot of the database and streamed, rows are fetched as
+they are written out, whatever the size of the board.
+
+An import creates a new table owned by the importing user, under the
+exported name or the next free one. Names and descriptions are checked as
+the routes check them. Every row gets a new id and new ranks, in the order
+of the export, the exported positions are not used. The members that have
+no account here are left out. A failed import removes what it inserted.
+
+The columns are inserted without their table_id, their tasks in batches of
+IMPORT_BATCH_SIZE rows, one transaction each. The table and its members are
+inserted, and the columns attached to it, in a last transaction, the board
+only appears once whole. The search triggers skip the tasks of detached
+columns, they are indexed at once when attached, which is several times
+faster than row by row.'''
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.exc import IntegrityError
+import search
+from database import DATABASE as db
+from forms_validation import validate_name
+from json_encoding import JSON_ENCODER
+from models.columns import Columns
+from models.members import Members
+from models.tables import Tables
+from models.tasks import Tasks
+from models.users import Users
+from ranking import sequence, spread
+
+FORMAT = 1
+IMPORT_BATCH_SIZE = 10000
+CHUNK_BYTES = 64 * 1024
+MAX_NAME_LENGTH = 25
+
+TABLES = Tables.__table__
+MEMBERS = Members.__table__
+COLUMNS = Columns.__table__
+TASKS = Tasks.__table__
+USERS = Users.__table__
+
+
+class BoardFormatError(ValueError):
+    '''The lines given to import_board are not a board export.'''
+
+
+# ##########################- Export -########################################
+
+def export_board(table_id):
+    '''Yield the lines of the export of the table matching id, in chunks of
+       about CHUNK_BYTES bytes.'''
+    connection = db.engine.connect().execution_options(stream_results=True)
+    transaction = connection.begin()
+
+    try:
+        # pysqlite only opens a transaction before writing, the export has
+        # to read every table from the same snapshot
+        if connection.dialect.name == 'sqlite':
+            connection.execute(text('BEGIN'))
+
+        chunk = []
+        size = 0
+
+        for record in _records(connection, table_id):
+            line = JSON_ENCODER.dumps(record) + b'\n'
+            chunk.append(line)
+            size += len(line)
+
+            if size >= CHUNK_BYTES:
+                yield b''.join(chunk)
+                chunk = []
+                size = 0
+
+        if chunk:
+            yield b''.join(chunk)
+    finally:
+        transaction.rollback()
+        connection.close()
+
+
+def _records(connection, table_id):
+    table = connection.execute(
+        TABLES.select().where(TABLES.c.id == table_id)).first()
+
+    if table is None:
+        return
+
+    yield {'type': 'table', 'format': FORMAT, 'id': table.id,
+           'name': table.name, 'creator': table.creator,
+           'shared': table.shared, 'version': table.version}
+
+    for member in connection.execute(
+            MEMBERS.select().where(MEMBERS.c.table_id == table_id)
+            .order_by(MEMBERS.c.id)):
+        yield {'type': 'member', 'id': member.id, 'email': member.user_id,
+               'role': member.role}
+
+    columns = connection.execute(
+        COLUMNS.select().where(COLUMNS.c.table_id == table_id)
+        .order_by(COLUMNS.c.position, COLUMNS.c.id)).fetchall()
+
+    for column in columns:
+        yield {'type': 'column', 'id': column.id, 'name': column.name,
+               'position': column.position}
+
+        # One column at a time, each read in the order of its index
+        for task in connection.execute(
+                TASKS.select().where(TASKS.c.column_id == column.id)
+                .order_by(TASKS.c.position, TASKS.c.id)):
+            yield {'type': 'task', 'id': task.id, 'column_id': column.id,
+                   'description': task.description,
+                   'position': task.position}
+
+
+# ##########################- Import -########################################
+
+def import_board(lines, owner_email, name=None):
+    '''Create a table owned by the user matching owner_email from the lines
+       of an export, named name or the exported name, followed by a number
+       if it is taken. Return the table's name and the number of rows
+       imported and skipped.'''
+    records = _parse(lines)
+    header = next(records, None)
+
+    if header is None or header.get('type') != 'table':
+        raise BoardFormatError("The export does not start with its table")
+    if header.get('format') != FORMAT:
+        raise BoardFormatError("Unsupported export format {}".format(
+            header.get('format')))
+
+    name = name or header.get('name')
+
+    if not isinstance(name, str) or not validate_name(name)[0]:
+        raise BoardFormatError("The export has no valid table name")
+
+    counts = {'members': 0, 'columns': 0, 'tasks': 0, 'skipped_members': 0}
+    shared = bool(header.get('shared'))
+    columns = []
+
+    try:
+        members = _import_rows(records, columns, counts)
+        table_name = _insert_table(name, owner_email, shared, members,
+                                   columns, counts)
+    except BaseException:
+        _remove_columns(columns)
+        raise
+    return (table_name, counts)
+
+
+def _parse(lines):
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+
+        if not line:
+            continue
+
+        try:
+            record = JSON_ENCODER.loads(line)
+        except ValueError:
+            raise BoardFormatError("Line {} is not JSON".format(number))
+
+        if not isinstance(record, dict):
+            raise BoardFormatError("Line {} is not an object".format(number))
+        record['line'] = number
+        yield record
+
+
+def _import_rows(records, columns, counts):
+    '''Insert the columns and their tasks, appending the ids of the columns
+       to columns in the order they come in. Return the member records.'''
+    names = set()
+    members = []
+    tasks = []
+
+    # Exported id of every column mapped to its new id and the ranks of its
+    # next tasks
+    imported = {}
+
+    for record in records:
+        kind = record.get('type')
+
+        if kind == 'member':
+            members.append(record)
+        elif kind == 'column':
+            name = _text(record, 'name')
+
+            if not validate_name(name)[0]:
+                raise BoardFormatError("Line {}: '{}' is not a valid column "
+                                       "name".format(record['line'], name))
+
+            # Not enforced by the index until the columns are attached
+            if name in names:
+                raise BoardFormatError("Line {}: column '{}' appears twice"
+                                       .format(record['line'], name))
+            names.add(name)
+            exported_id = record.get('id')
+
+            if not isinstance(exported_id, (int, str)):
+                raise BoardFormatError("Line {}: 'id' is missing".format(
+                    record['line']))
+            column_id = _insert_column(name)
+            columns.append(column_id)
+            imported[exported_id] = (column_id, sequence())
+            counts['columns'] += 1
+        elif kind == 'task':
+            column_id = record.get('column_id')
+            column = (imported.get(column_id)
+                      if isinstance(column_id, (int, str)) else None)
+
+            if column is None:
+                raise BoardFormatError("Line {}: task of an unknown column"
+                                       .format(record['line']))
+            column_id, ranks = column
+            tasks.append({'description': _text(record, 'description'),
+                          'column_id': column_id,
+                          'position': next(ranks)})
+
+            if len(tasks) >= IMPORT_BATCH_SIZE:
+                _insert_batch(TASKS, tasks)
+                counts['tasks'] += len(tasks)
+                tasks = []
+        else:
+            raise BoardFormatError("Line {}: unknown record type '{}'"
+                                   .format(record['line'], kind))
+
+    if tasks:
+        _insert_batch(TASKS, tasks)
+        counts['tasks'] += len(tasks)
+    return members
+
+
+def _text(record, key):
+    '''Return the text field of the record matching key, which can't be
+       empty.'''
+    value = record.get(key)
+
+    if not isinstance(value, str) or not value:
+        raise BoardFormatError("Line {}: '{}' is missing".format(
+            record['line'], key))
+    return value
+
+
+def _insert_column(name):
+    '''Insert a column attached to no table, return its id. It is ranked
+       once attached.'''
+    with db.engine.begin() as connection:
+        result = connection.execute(COLUMNS.insert().values(
+            name=name, table_id=None, position=''))
+    return result.inserted_primary_key[0]
+
+
+def _insert_table(name, owner_email, shared, members, column_ids, counts):
+    '''Insert the table under the first free name along with its members,
+       and attach its columns, in a single transaction. Return its name.'''
+    attempt = 1
+
+    while True:
+        candidate = _numbered(name, attempt)
+        attempt += 1
+
+        if _name_taken(candidate):
+            continue
+
+        try:
+            with db.engine.begin() as connection:
+                table_id = connection.execute(TABLES.insert().values(
+                    name=candidate, creator=owner_email, shared=shared,
+                    version=0)).inserted_primary_key[0]
+
+                if shared:
+                    _insert_members(connection, table_id, owner_email,
+                                    members, counts)
+
+                # Ranked in the order they came in, the order of the export
+                if column_ids:
+                    connection.execute(
+                        COLUMNS.update()
+                        .where(COLUMNS.c.id == bindparam('column_id'))
+                        .values(table_id=table_id,
+                                position=bindparam('rank')),
+                        [{'column_id': column_id, 'rank': rank}
+                         for column_id, rank in zip(column_ids,
+                                                    spread(len(column_ids)))])
+                search.index_table(connection, table_id)
+        except IntegrityError:
+            # Another table may have taken the name since
+            if _name_taken(candidate):
+                continue
+            raise
+        return candidate
+
+
+def _name_taken(name):
+    return db.engine.execute(
+        select([TABLES.c.id]).where(TABLES.c.name == name)).first() is not None
+
+
+def _numbered(name, attempt):
+    '''Return name, or name followed by the attempt number, cut to fit the
+       longest name allowed.'''
+    if attempt == 1:
+        return name[:MAX_NAME_LENGTH]
+
+    # A name can't end with a separator
+    suffix = '-{}'.format(attempt)
+    return name[:MAX_NAME_LENGTH - len(suffix)].rstrip(' ._-') + suffix
+
+
+def _insert_members(connection, table_id, owner_email, records, counts):
+    '''Insert the members that have an account, the owner being the
+       table's creator. The exported creator becomes an admin, a member
+       without a known role a visitor. Only shared tables have members.'''
+    emails = {record.get('email') for record in records}
+    known = {email for (email,) in connection.execute(
+        select([USERS.c.email])
+        .where(USERS.c.email.in_([email for email in emails
+                                  if isinstance(email, str)])))}
+    rows = [{'table_id': table_id, 'user_id': owner_email, 'role': 'creator'}]
+
+    for record in records:
+        email = record.get('email')
+
+        if email == owner_email:
+            continue
+        if email not in known:
+            counts['skipped_members'] += 1
+            continue
+
+        role = record.get('role')
+
+        if role == 'creator':
+            role = 'admin'
+        elif role not in ('admin', 'editor', 'visitor'):
+            role = 'visitor'
+        rows.append({'table_id': table_id, 'user_id': email, 'role': role})
+        known.discard(email)
+
+    connection.execute(MEMBERS.insert(), rows)
+    counts['members'] = len(rows)
+
+
+def _insert_batch(table, rows):
+    with db.engine.begin() as connection:
+        connection.execute(table.insert(), rows)
+
+
+def _remove_columns(column_ids):
+    '''Delete the columns matching ids, attached to no table, and their
+       tasks.'''
+    if not column_ids:
+        return
+
+    with db.engine.begin() as connection:
+        connection.execute(TASKS.delete().where(
+            TASKS.c.column_id.in_(column_ids)))
+        connection.execute(COLUMNS.delete().where(
+            COLUMNS.c.id.in_(column_ids)))
@@ -0,0 +1,114 @@
+'''Append-only log of the changes made to every table.
+
+Every change made through the models is recorded by Tables.touch(), with
+its type and data, and written to board_changes in the transaction that
+makes it, right before the commit. A client that missed some changes, after
+losing its connection for instance, catches up with changes_since() instead
+of reloading the whole board.
+
+Only the changes of the last BOARD_CHANGES_KEEP versions of every table are
+kept, older ones are deleted as new ones are written. A client behind the
+oldest change kept, or whose version the log can't account for, is told to
+resync, that is to reload the board.
+
+Rebalancing ranks is logged with the new rank of every task or column,
+{'positions': {id: position}}, ranks given to rows afterwards are only
+valid among the new ones.'''
+import threading
+from sqlalchemy import event, func
+from database import DATABASE as db
+from json_encoding import JSON_ENCODER
+from models.changes import BoardChanges
+
+DEFAULT_KEEP = 1000
+
+_PENDING = 'board_changes'
+
+
+class ChangeLog:
+    '''Writes the changes recorded during a transaction when it commits.'''
+
+    def __init__(self):
+        self.keep = DEFAULT_KEEP
+        self.recorded = 0
+        self.compacted = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        '''Read the number of versions to keep and hook the session.'''
+        self.keep = app.config.get('BOARD_CHANGES_KEEP', DEFAULT_KEEP)
+
+        if not event.contains(db.session, 'before_commit', self._write):
+            event.listen(db.session, 'before_commit', self._write)
+            event.listen(db.session, 'after_transaction_end', self._forget)
+
+    def record(self, table, change_type, data):
+        '''Log the change once the current transaction commits. data can be
+           a function, called after the flush, when it needs the ids of the
+           new rows.'''
+        db.session().info.setdefault(_PENDING, []).append(
+            (table, change_type, data))
+
+    def changes_since(self, table, since):
+        '''Return the changes made to the table after version since, in
+           order, and whether the client has to resync instead.'''
+        if since == table.version:
+            return ([], False)
+        if since > table.version or since < 0:
+            return ([], True)
+
+        oldest = (db.session.query(func.min(BoardChanges.version))
+                  .filter(BoardChanges.table_id == table.id).scalar())
+
+        # A commit bumps the version once per flush, the change it logged
+        # can follow a version that was never logged
+        if oldest is None or since < oldest - 1:
+            return ([], True)
+        return (BoardChanges.query
+                .filter(BoardChanges.table_id == table.id,
+                        BoardChanges.version > since)
+                .order_by(BoardChanges.id).all(), False)
+
+    def stats(self):
+        '''Return the number of changes written and compacted away.'''
+        with self._lock:
+            return {'recorded': self.recorded, 'compacted': self.compacted}
+
+    def _write(self, session):
+        pending = session.info.pop(_PENDING, None)
+
+        if not pending:
+            return
+
+        # Assigns the ids of the new rows and the tables' new versions
+        session.flush()
+        versions = {}
+
+        for table, change_type, data in pending:
+            versions[table.id] = table.version
+            session.add(BoardChanges(
+                table_id=table.id, version=table.version,
+                change_type=change_type,
+                data=JSON_ENCODER.dumps(data() if callable(data) else data)
+                .decode('utf-8')))
+
+        compacted = 0
+
+        for table_id, version in versions.items():
+            compacted += (BoardChanges.query
+                          .filter(BoardChanges.table_id == table_id,
+                                  BoardChanges.version <= version - self.keep)
+                          .delete(synchronize_session=False))
+        session.flush()
+
+        with self._lock:
+            self.recorded += len(pending)
+            self.compacted += compacted
+
+    def _forget(self, session, transaction):
+        # Changes of a transaction rolled back or closed are dropped
+        if transaction.parent is None:
+            session.info.pop(_PENDING, None)
+
+
+CHANGE_LOG = ChangeLog()
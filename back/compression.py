@@ -0,0 +1,126 @@
+'''Compression of the responses, negotiated through Accept-Encoding.
+
+JSON, JavaScript, CSS, HTML and other text responses of at least
+COMPRESSION_MIN_SIZE bytes are compressed with brotli when the client takes
+it and the brotli package is installed, with gzip otherwise. The compressed
+static files are kept, they are only compressed once per version.
+
+A compressed response's ETag becomes weak, If-None-Match is compared with
+the weak comparison function so it still matches the uncompressed one.'''
+import gzip
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+STATIC_ENTRIES = 64
+
+COMPRESSIBLE = {'application/json', 'application/javascript',
+                'application/xml', 'image/svg+xml'}
+
+
+class Compressor:
+    '''Compresses the application's responses.'''
+
+    def __init__(self):
+        self.enabled = True
+        self.min_size = DEFAULT_MIN_SIZE
+        self.level = DEFAULT_LEVEL
+        self.brotli_quality = DEFAULT_BROTLI_QUALITY
+        self.encodings = ['br', 'gzip'] if brotli else ['gzip']
+        self._static = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        '''Read the settings and compress the responses of the application.'''
+        self.enabled = app.config.get('COMPRESSION_ENABLED', True)
+        self.min_size = app.config.get('COMPRESSION_MIN_SIZE',
+                                       DEFAULT_MIN_SIZE)
+        self.level = app.config.get('COMPRESSION_LEVEL', DEFAULT_LEVEL)
+        self.brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY',
+                                             DEFAULT_BROTLI_QUALITY)
+
+        if self.enabled:
+            app.after_request(self.compress)
+
+    def compress(self, response):
+        '''Compress the response if it is worth it and the client takes it.'''
+        if (response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or not _compressible(response.mimetype)
+                or (response.is_streamed and not response.direct_passthrough)):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+
+        if encoding is None:
+            return response
+
+        # Static files are sent straight from the disk, keyed by their ETag
+        key = None
+
+        if response.direct_passthrough:
+            etag, _ = response.get_etag()
+
+            if etag is None:
+                return response
+            key = (request.path, etag, encoding)
+
+            with self._lock:
+                body = self._static.get(key)
+
+            source = response.response
+            response.direct_passthrough = False
+
+            if body is None:
+                data = response.get_data()
+
+            if hasattr(source, 'close'):
+                source.close()
+
+            if body is not None:
+                return self._encoded(response, body, encoding)
+        else:
+            data = response.get_data()
+
+        if len(data) < self.min_size:
+            return response
+
+        body = self._compress(data, encoding)
+
+        if key is not None:
+            with self._lock:
+                self._static[key] = body
+
+                while len(self._static) > STATIC_ENTRIES:
+                    self._static.popitem(last=False)
+        return self._encoded(response, body, encoding)
+
+    def _compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def _encoded(self, response, body, encoding):
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+
+        if etag is not None and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def _compressible(mimetype):
+    return (mimetype or '').startswith('text/') or mimetype in COMPRESSIBLE
+
+
+COMPRESSOR = Compressor()
@@ -0,0 +1,136 @@
+'''Configuration profiles of the application.
+
+create_app() loads the profile named by the TRELLO_CONFIG environment
+variable, 'development' when it is not set. A Python file named by the
+TRELLO_SETTINGS environment variable can then override any setting, and
+DATABASE_URL, when set, gives the database to use.
+
+Sessions are signed with SECRET_KEY, every process serving the application
+must use the same one. It is read from the SECRET_KEY environment variable
+or from the file named by SECRET_KEY_FILE, in the environment or in the
+settings. The development profile makes one up when none is given, the
+production profile refuses to start without one.'''
+import os
+import secrets
+
+
+class Config:
+    SECRET_KEY = None
+    SECRET_KEY_FILE = None
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///.database/trello.db'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    BOARD_CACHE_BYTES = 64 * 1024 * 1024
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+
+    # Versions of every table whose changes are kept, see change_log.py
+    BOARD_CHANGES_KEEP = 1000
+
+    # Board changes pushed over Socket.IO, see realtime.py. serve.py runs a
+    # single worker while enabled.
+    REALTIME_ENABLED = True
+
+    # See hashing.py, stored hashes made with another method are replaced
+    # on login. No PASSWORD_HASH_WORKERS means one per CPU.
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:150000'
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = None
+    PASSWORD_HASH_MAX_PENDING = 64
+
+    # Seconds a user loaded by flask_login is kept, see user_cache.py
+    USER_CACHE_TTL = 60
+    USER_CACHE_SIZE = 10000
+
+    # Requests running more SQL statements are logged, see metrics.py.
+    # /metrics asks for 'Authorization: Bearer <METRICS_TOKEN>' when set.
+    METRICS_QUERY_WARNING = 30
+    METRICS_TOKEN = None
+
+    # See profiling.py, requests are profiled only when enabled and given
+    # the token
+    PROFILING_ENABLED = False
+    PROFILING_TOKEN = None
+    PROFILING_DIR = '.profiles'
+    PROFILING_PER_MINUTE = 6
+    PROFILING_KEEP = 50
+
+    # 'auto' encodes with orjson when installed, see json_encoding.py
+    JSON_BACKEND = 'auto'
+
+    # Text responses of COMPRESSION_MIN_SIZE bytes or more are compressed,
+    # with brotli when installed and accepted, gzip otherwise. See
+    # compression.py.
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 1024
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 5
+
+    # Applied to every new SQLite connection. WAL lets readers go on while
+    # a write is in progress, NORMAL only syncs at checkpoints in that mode.
+    SQLITE_PRAGMAS = {'journal_mode': 'WAL',
+                      'synchronous': 'NORMAL',
+                      'busy_timeout': 5000,
+                      'foreign_keys': 'ON',
+                      'cache_size': -16 * 1024,
+                      'mmap_size': 256 * 1024 * 1024,
+                      'temp_store': 'MEMORY'}
+
+    # Connection pool, see database.engine_options()
+    DATABASE_POOL_SIZE = 5
+    DATABASE_MAX_OVERFLOW = 10
+    DATABASE_POOL_RECYCLE = -1
+    DATABASE_POOL_PRE_PING = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+
+
+class DevelopmentConfig(Config):
+    SECRET_KEY = secrets.token_urlsafe(64)
+
+
+class ProductionConfig(Config):
+    DATABASE_POOL_SIZE = 10
+    DATABASE_MAX_OVERFLOW = 20
+
+    # Client/server databases drop idle connections
+    DATABASE_POOL_RECYCLE = 1800
+    DATABASE_POOL_PRE_PING = True
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SECRET_KEY = secrets.token_urlsafe(64)
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+PROFILES = {'development': DevelopmentConfig,
+            'production': ProductionConfig,
+            'testing': TestingConfig}
+
+
+def load(app, name=None):
+    '''Configure the application with the profile named name, or the one
+       the environment asks for.'''
+    name = name or os.environ.get('TRELLO_CONFIG', 'development')
+
+    if name not in PROFILES:
+        raise ValueError("Unknown configuration profile '{}', expected one "
+                         "of {}".format(name, ', '.join(sorted(PROFILES))))
+
+    app.config.from_object(PROFILES[name])
+    app.config.from_envvar('TRELLO_SETTINGS', silent=True)
+
+    if os.environ.get('DATABASE_URL'):
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
+
+    key_file = (os.environ.get('SECRET_KEY_FILE')
+                or app.config.get('SECRET_KEY_FILE'))
+
+    if os.environ.get('SECRET_KEY'):
+        app.config['SECRET_KEY'] = os.environ['SECRET_KEY']
+    elif key_file:
+        with open(key_file) as key:
+            app.config['SECRET_KEY'] = key.read().strip()
+
+    if not app.config.get('SECRET_KEY'):
+        raise RuntimeError("No secret key configured, set SECRET_KEY or "
+                           "SECRET_KEY_FILE")
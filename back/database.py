@@ -1,4 +1,56 @@
 '''Set the database and flask application.'''
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
 
 DATABASE = SQLAlchemy()
+
+
+def init_database(app):
+    '''Bind DATABASE to the application, its engine being set up from the
+       application's configuration.'''
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    DATABASE.app = app
+    DATABASE.init_app(app)
+
+    engine = DATABASE.get_engine(app)
+
+    if engine.dialect.name == 'sqlite':
+        pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+        event.listen(engine, 'connect',
+                     lambda connection, _: _set_pragmas(connection, pragmas))
+
+
+def engine_options(config):
+    '''Return the options the engine is created with, the pool settings of
+       the configuration followed by its SQLALCHEMY_ENGINE_OPTIONS.
+
+       Flask-SQLAlchemy opens a new connection to an SQLite file for every
+       session, losing the connection's page cache each time, SQLite files
+       get a pool of connections kept open instead.'''
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {'pool_pre_ping': config['DATABASE_POOL_PRE_PING']}
+
+    if url.drivername.startswith('sqlite'):
+        if url.database in (None, '', ':memory:'):
+            return dict(options, **config['SQLALCHEMY_ENGINE_OPTIONS'])
+
+        # Pooled connections move between threads, one thread at a time
+        options['poolclass'] = QueuePool
+        options['connect_args'] = {'check_same_thread': False}
+
+    options.update(pool_size=config['DATABASE_POOL_SIZE'],
+                   max_overflow=config['DATABASE_MAX_OVERFLOW'],
+                   pool_recycle=config['DATABASE_POOL_RECYCLE'])
+    options.update(config['SQLALCHEMY_ENGINE_OPTIONS'])
+    return options
+
+
+def _set_pragmas(connection, pragmas):
+    '''Apply the pragmas to a new SQLite connection.'''
+    cursor = connection.cursor()
+
+    for name, value in pragmas.items():
+        cursor.execute('PRAGMA {} = {}'.format(name, value))
+    cursor.close()
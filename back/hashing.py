@@ -0,0 +1,162 @@
+'''Password hashing on a dedicated, bounded pool of threads.
+
+Hashing a password is slow on purpose. Done on the request threads, a burst
+of logins and signups takes all of them and every other request waits
+behind it. The hashes are computed by a pool of workers instead, at most
+`workers` at a time while at most `max_pending` more wait for a worker,
+passwords beyond that are turned away at once with HasherBusy. hashlib
+releases the GIL while hashing, so the workers do run in parallel.
+
+The method and salt length come from the configuration, a stored hash made
+with another method is replaced after the next successful login.'''
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import (DEFAULT_PBKDF2_ITERATIONS,
+                               check_password_hash, generate_password_hash)
+
+DEFAULT_METHOD = 'pbkdf2:sha256:{:d}'.format(DEFAULT_PBKDF2_ITERATIONS)
+DEFAULT_SALT_LENGTH = 16
+DEFAULT_MAX_PENDING = 64
+
+
+class HasherBusy(Exception):
+    '''Raised when too many passwords are already waiting to be hashed.'''
+
+
+class PasswordHasher:
+    '''Hash and check passwords off the request threads.'''
+
+    def __init__(self, method=DEFAULT_METHOD, salt_length=DEFAULT_SALT_LENGTH,
+                 workers=None, max_pending=DEFAULT_MAX_PENDING):
+        self.method = _full_method(method)
+        self.salt_length = salt_length
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self.running = 0
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.hash_seconds = 0.0
+        self.max_hash_seconds = 0.0
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        '''Read the hashing settings from the application's configuration.'''
+        self.method = _full_method(app.config.get('PASSWORD_HASH_METHOD',
+                                                  DEFAULT_METHOD))
+        self.salt_length = app.config.get('PASSWORD_SALT_LENGTH',
+                                          DEFAULT_SALT_LENGTH)
+        self.workers = (app.config.get('PASSWORD_HASH_WORKERS')
+                        or os.cpu_count() or 1)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING',
+                                          DEFAULT_MAX_PENDING)
+
+    def hash(self, password):
+        '''Return the hash of the password.'''
+        password_hash = self._run(generate_password_hash, password,
+                                  self.method, self.salt_length)
+
+        with self._lock:
+            self.hashed += 1
+        return password_hash
+
+    def verify(self, password_hash, password):
+        '''Return True if the password matches the hash.'''
+        return self.verify_and_update(password_hash, password)[0]
+
+    def verify_and_update(self, password_hash, password):
+        '''Check the password against the hash, return whether it matches
+           and, when it does but the hash was not made with the configured
+           method, the new hash to store in its place.'''
+        return self._run(self._verify_and_update, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        '''Return True if the hash was made with another method.'''
+        return password_hash.split('$', 1)[0] != self.method
+
+    def stats(self):
+        '''Return the hashing counters, times being in seconds.'''
+        with self._lock:
+            return {'workers': self.workers,
+                    'max_pending': self.max_pending,
+                    'pending': self.pending,
+                    'running': self.running,
+                    'hashed': self.hashed,
+                    'verified': self.verified,
+                    'rehashed': self.rehashed,
+                    'rejected': self.rejected,
+                    'wait_seconds': self.wait_seconds,
+                    'hash_seconds': self.hash_seconds,
+                    'max_hash_seconds': self.max_hash_seconds}
+
+    def _verify_and_update(self, password_hash, password):
+        if not check_password_hash(password_hash, password):
+            matches, new_hash = False, None
+        elif self.needs_rehash(password_hash):
+            matches = True
+            new_hash = generate_password_hash(password, self.method,
+                                              self.salt_length)
+        else:
+            matches, new_hash = True, None
+
+        with self._lock:
+            self.verified += 1
+
+            if new_hash:
+                self.rehashed += 1
+        return (matches, new_hash)
+
+    def _run(self, function, *args):
+        '''Run function(*args) on a worker and return its result.'''
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy("Too many passwords waiting to be hashed")
+            self.pending += 1
+
+            # Threads don't survive a fork, a forked worker gets its own pool
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='password-hasher')
+                self._pid = os.getpid()
+            executor = self._executor
+
+        return executor.submit(self._timed, time.perf_counter(), function,
+                               *args).result()
+
+    def _timed(self, queued, function, *args):
+        started = time.perf_counter()
+
+        with self._lock:
+            self.pending -= 1
+            self.running += 1
+            self.wait_seconds += started - queued
+
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self.running -= 1
+                self.hash_seconds += elapsed
+                self.max_hash_seconds = max(self.max_hash_seconds, elapsed)
+
+
+def _full_method(method):
+    '''Return the method as werkzeug writes it in the hashes, with the
+       number of iterations of pbkdf2 spelled out.'''
+    if method.startswith('pbkdf2:') and method.count(':') == 1:
+        return '{}:{:d}'.format(method, DEFAULT_PBKDF2_ITERATIONS)
+    return method
+
+
+PASSWORD_HASHER = PasswordHasher()
@@ -0,0 +1,67 @@
+'''JSON encoding of the responses.
+
+Serializing a large board is a good share of the time spent answering for
+it. dumps() uses orjson when it is installed and the standard library
+otherwise, JSON_BACKEND picks one explicitly. Both give compact UTF-8
+output, keys in the order the dicts were built.'''
+import json
+
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ('orjson', 'stdlib')
+
+
+class JsonEncoder:
+    '''Encodes values with the fastest backend available.'''
+
+    def __init__(self):
+        self.backend = 'orjson' if orjson else 'stdlib'
+
+    def init_app(self, app):
+        '''Read the backend to use from the application's configuration,
+           'auto' taking orjson when installed.'''
+        backend = app.config.get('JSON_BACKEND', 'auto')
+
+        if backend == 'auto':
+            backend = 'orjson' if orjson else 'stdlib'
+        elif backend not in BACKENDS:
+            raise ValueError("Unknown JSON backend '{}', expected one of {}"
+                             .format(backend, ', '.join(BACKENDS)))
+        elif backend == 'orjson' and orjson is None:
+            raise RuntimeError("JSON_BACKEND is 'orjson' but orjson is not "
+                               "installed")
+        self.backend = backend
+
+    def dumps(self, value):
+        '''Return value encoded as JSON, in bytes.'''
+        if self.backend == 'orjson':
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(value, ensure_ascii=False,
+                          separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        '''Return the value encoded in data, bytes or text.'''
+        if self.backend == 'orjson':
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+def jsonify(*args, **kwargs):
+    '''Same as flask.jsonify, encoding with JSON_ENCODER.'''
+    if args and kwargs:
+        raise TypeError('jsonify() takes either args or kwargs, not both')
+
+    if len(args) == 1:
+        value = args[0]
+    else:
+        value = args or kwargs
+    return current_app.response_class(JSON_ENCODER.dumps(value),
+                                      mimetype='application/json')
+
+
+JSON_ENCODER = JsonEncoder()
@@ -0,0 +1,202 @@
+'''Request instrumentation, exposed in the Prometheus text format.
+
+Every request handled by flask records, under its route template, its wall
+time, the time spent in the database, the number of SQL statements it ran
+and the size of its response into histograms. The statements are seen
+through the engine's cursor events, which run on the request's thread.
+
+A request running more statements than METRICS_QUERY_WARNING is logged, a
+board whose serialization starts querying once per column or task shows up
+there first.
+
+Counters are kept per process, each server process exposes its own.'''
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+DEFAULT_QUERY_WARNING = 30
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Keys of the stats() of the registered components that only ever grow
+COUNTER_KEYS = {'hits', 'misses', 'evictions', 'hashed', 'verified',
+                'rehashed', 'rejected', 'wait_seconds', 'hash_seconds',
+                'captured', 'refused', 'recorded', 'compacted'}
+
+
+class Histogram:
+    '''Cumulative histogram of values, one series per set of labels.'''
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        '''Record the value in the series of the labels.'''
+        with self._lock:
+            series = self._series.get(labels)
+
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0]
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        '''Return the lines of the histogram in the text format.'''
+        lines = ['# HELP {} {}'.format(self.name, self.documentation),
+                 '# TYPE {} histogram'.format(self.name)]
+
+        with self._lock:
+            series = sorted((labels, [list(values[0])] + values[1:])
+                            for labels, values in self._series.items())
+
+        for labels, (buckets, total, count) in series:
+            pairs = list(zip(self.labels, labels))
+
+            for bound, bucket_count in zip(self.buckets, buckets):
+                lines.append(_sample(self.name + '_bucket',
+                                     pairs + [('le', _number(bound))],
+                                     bucket_count))
+            lines.append(_sample(self.name + '_bucket', pairs + [('le', '+Inf')],
+                                 count))
+            lines.append(_sample(self.name + '_sum', pairs, total))
+            lines.append(_sample(self.name + '_count', pairs, count))
+        return lines
+
+
+class Metrics:
+    '''Instruments the application and its database engine.'''
+
+    def __init__(self, prefix='trello'):
+        self.prefix = prefix
+        self.query_warning = DEFAULT_QUERY_WARNING
+        self.duration = Histogram(
+            prefix + '_request_duration_seconds',
+            'Time taken to answer requests.',
+            ('method', 'route', 'status'), SECONDS_BUCKETS)
+        self.db_time = Histogram(
+            prefix + '_request_db_seconds',
+            'Time spent running SQL statements per request.',
+            ('method', 'route'), SECONDS_BUCKETS)
+        self.queries = Histogram(
+            prefix + '_request_queries',
+            'SQL statements run per request.',
+            ('method', 'route'), QUERIES_BUCKETS)
+        self.response_size = Histogram(
+            prefix + '_response_bytes',
+            'Size of the response bodies.',
+            ('method', 'route'), BYTES_BUCKETS)
+        self._stats = []
+
+    def init_app(self, app, engine):
+        '''Time the application's requests and the engine's statements.'''
+        self.query_warning = app.config.get('METRICS_QUERY_WARNING',
+                                            DEFAULT_QUERY_WARNING)
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(engine, 'before_cursor_execute', self._start_statement)
+        event.listen(engine, 'after_cursor_execute', self._end_statement)
+
+    def register_stats(self, name, stats):
+        '''Expose the numbers returned by stats() under name.'''
+        self._stats.append((name, stats))
+
+    def render(self):
+        '''Return every metric in the Prometheus text format.'''
+        lines = []
+
+        for histogram in (self.duration, self.db_time, self.queries,
+                          self.response_size):
+            lines.extend(histogram.render())
+
+        for name, stats in self._stats:
+            for key, value in sorted(stats().items()):
+                metric = '{}_{}_{}'.format(self.prefix, name, key)
+
+                if key in COUNTER_KEYS:
+                    metric += '_total'
+                    kind = 'counter'
+                else:
+                    kind = 'gauge'
+                lines.append('# TYPE {} {}'.format(metric, kind))
+                lines.append(_sample(metric, [], value))
+        return '\n'.join(lines) + '\n'
+
+    def _start_request(self):
+        g._metrics = {'started': time.perf_counter(), 'queries': 0,
+                      'db_seconds': 0.0, 'recorded': False}
+
+    def _end_request(self, response):
+        size = 0 if response.is_streamed else response.calculate_content_length()
+        self._record(response.status_code, size or 0)
+        return response
+
+    def _teardown_request(self, exception):
+        # after_request is skipped when the view raised
+        if exception is not None:
+            self._record(500, 0)
+
+    def _record(self, status, size):
+        state = g.get('_metrics')
+
+        if state is None or state['recorded']:
+            return
+
+        state['recorded'] = True
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        method = request.method
+        self.duration.observe(time.perf_counter() - state['started'],
+                              method, route, str(status))
+        self.db_time.observe(state['db_seconds'], method, route)
+        self.queries.observe(state['queries'], method, route)
+        self.response_size.observe(size, method, route)
+
+        if self.query_warning and state['queries'] > self.query_warning:
+            current_app.logger.warning(
+                "%s %s ran %d SQL statements (route %s)", method,
+                request.full_path.rstrip('?'), state['queries'], route)
+
+    def _start_statement(self, connection, cursor, statement, parameters,
+                         context, executemany):
+        connection.info['_metrics_started'] = time.perf_counter()
+
+    def _end_statement(self, connection, cursor, statement, parameters,
+                       context, executemany):
+        if has_request_context() and '_metrics' in g:
+            g._metrics['queries'] += 1
+            g._metrics['db_seconds'] += (time.perf_counter()
+                                         - connection.info['_metrics_started'])
+
+
+def _number(value):
+    '''Format a number the way the text format expects it.'''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _sample(name, labels, value):
+    if labels:
+        name += '{' + ','.join('{}="{}"'.format(key, _escape(label))
+                               for key, label in labels) + '}'
+    return '{} {}'.format(name, _number(value))
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('\n', '\\n')
+            .replace('"', '\\"'))
+
+
+METRICS = Metrics()
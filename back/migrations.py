@@ -0,0 +1,169 @@
+'''Versioned schema migrations.
+
+DATABASE.create_all() only creates missing tables, it never alters the
+schema of an existing database. Each migration below brings an existing
+database one version further without touching its data, the version reached
+is stored in SQLite's user_version pragma.
+
+Only SQLite databases are migrated, the databases the application supported
+before the migrations existed. Any other database is created from the
+current models and always counts as up to date.
+
+Every step is written so that it can safely run again, a migration that
+fails half way can simply be retried once the cause has been fixed.'''
+import search
+from models.changes import BoardChanges
+from models.tables import Tables
+from ranking import spread
+
+
+def _has_column(connection, table, column):
+    '''Return True if the table already has the column.'''
+    return any(row[1] == column for row in
+               connection.execute('PRAGMA table_info({})'.format(table)))
+
+
+def _add_hot_path_indexes(connection):
+    '''Index the columns the models filter on.'''
+    connection.execute('CREATE INDEX IF NOT EXISTS ix_tables_creator '
+                       'ON tables (creator)')
+    connection.execute('CREATE UNIQUE INDEX IF NOT EXISTS '
+                       'ix_columns_table_id_name ON columns (table_id, name)')
+    connection.execute('CREATE INDEX IF NOT EXISTS ix_tasks_column_id '
+                       'ON tasks (column_id)')
+    connection.execute('CREATE UNIQUE INDEX IF NOT EXISTS '
+                       'ix_members_table_id_user_id '
+                       'ON members (table_id, user_id)')
+    connection.execute('CREATE INDEX IF NOT EXISTS ix_members_user_id '
+                       'ON members (user_id)')
+
+
+def _add_tables_version(connection):
+    '''Add the version counter bumped by every change made to a table.'''
+    if not _has_column(connection, 'tables', 'version'):
+        connection.execute('ALTER TABLE tables '
+                           "ADD COLUMN version INTEGER NOT NULL DEFAULT '0'")
+
+
+def _backfill_positions(connection, table, parent):
+    '''Rank the rows of table in id order within each parent.'''
+    ranked = {}
+
+    for id, parent_id in connection.execute(
+            'SELECT id, {} FROM {} ORDER BY {}, id'.format(parent, table,
+                                                         parent)):
+        ranked.setdefault(parent_id, []).append(id)
+
+    for ids in ranked.values():
+        for id, position in zip(ids, spread(len(ids))):
+            connection.execute('UPDATE {} SET position = ? WHERE id = ?'
+                               .format(table), (position, id))
+
+
+def _add_positions(connection):
+    '''Add the ranks ordering tasks in their column and columns in their
+       table, existing rows keep the order of their ids.'''
+    for table, parent in (('tasks', 'column_id'), ('columns', 'table_id')):
+        if not _has_column(connection, table, 'position'):
+            connection.execute('ALTER TABLE {} '
+                               "ADD COLUMN position TEXT NOT NULL DEFAULT ''"
+                               .format(table))
+            _backfill_positions(connection, table, parent)
+        connection.execute('CREATE INDEX IF NOT EXISTS ix_{0}_{1}_position '
+                           'ON {0} ({1}, position)'.format(table, parent))
+
+    # Covered by ix_tasks_column_id_position
+    connection.execute('DROP INDEX IF EXISTS ix_tasks_column_id')
+
+
+def _add_board_changes(connection):
+    '''Create the change log, see change_log.py.'''
+    BoardChanges.__table__.create(connection, checkfirst=True)
+
+
+def _stop_reusing_table_ids(connection):
+    '''Recreate the tables table with AUTOINCREMENT, SQLite otherwise hands
+       the id of the newest table deleted to the next one created.
+
+       SQLite can't alter a primary key, the rows are kept aside, the table
+       dropped and created again from the model. Dropping it deletes the
+       change log of every table, kept aside as well, and leaves the
+       columns and members without their table until the rows are back,
+       which the deferred foreign keys allow.'''
+    schema = connection.execute("SELECT sql FROM sqlite_master "
+                                "WHERE type = 'table' AND name = 'tables'") \
+        .scalar()
+
+    if 'AUTOINCREMENT' in schema.upper():
+        return
+
+    kept = (('kept_tables', 'tables', 'id, name, creator, shared, version'),
+            ('kept_board_changes', 'board_changes',
+             'id, table_id, version, change_type, data'))
+
+    for copy, table, columns in kept:
+        connection.execute('DROP TABLE IF EXISTS temp.{}'.format(copy))
+        connection.execute('CREATE TEMP TABLE {} AS SELECT {} FROM {} '
+                           'WHERE 0'.format(copy, columns, table))
+
+    # The first INSERT starts the transaction the pragma applies to
+    for copy, table, columns in kept:
+        connection.execute('INSERT INTO {} SELECT {} FROM {}'
+                           .format(copy, columns, table))
+
+    connection.execute('PRAGMA defer_foreign_keys = ON')
+    connection.execute('DROP TABLE tables')
+    Tables.__table__.create(connection)
+
+    for copy, table, columns in kept:
+        connection.execute('INSERT INTO {0} ({1}) SELECT {1} FROM {2}'
+                           .format(table, columns, copy))
+        connection.execute('DROP TABLE temp.{}'.format(copy))
+
+    # The trigger renaming the indexed tables went with the table
+    search.install(connection)
+
+
+# (version, description, step), in the order they must be applied.
+MIGRATIONS = [
+    (1, 'Add indexes and unique constraints for the hot lookup paths',
+     _add_hot_path_indexes),
+    (2, 'Add a version counter to the tables', _add_tables_version),
+    (3, 'Rank tasks and columns', _add_positions),
+    (4, 'Add the full-text search index of the tasks', search.install),
+    (5, 'Add the log of the changes made to the tables', _add_board_changes),
+    (6, 'Stop reusing the ids of the deleted tables', _stop_reusing_table_ids),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(engine):
+    '''Return the schema version of the database.'''
+    if engine.dialect.name != 'sqlite':
+        return LATEST_VERSION
+    return engine.execute('PRAGMA user_version').scalar()
+
+
+def stamp(engine, version=LATEST_VERSION):
+    '''Record the database as being at version without running anything,
+       used for databases freshly created from the models.'''
+    if engine.dialect.name == 'sqlite':
+        engine.execute('PRAGMA user_version = {:d}'.format(version))
+
+
+def upgrade(engine):
+    '''Apply the migrations the database is missing and return the list of
+       the ones applied.'''
+    applied = []
+    current = get_version(engine)
+
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+
+        with engine.begin() as connection:
+            step(connection)
+            connection.execute('PRAGMA user_version = {:d}'.format(version))
+        applied.append((version, description))
+    return applied
@@ -0,0 +1,25 @@
+from database import DATABASE as db
+from json_encoding import JSON_ENCODER
+
+
+class BoardChanges(db.Model):
+    '''A change made to a table, see change_log.py.'''
+    __tablename__ = "board_changes"
+    __table_args__ = (db.Index('ix_board_changes_table_id_version',
+                               'table_id', 'version'),)
+    id = db.Column(db.Integer, primary_key=True)
+    table_id = db.Column(db.Integer,
+                         db.ForeignKey('tables.id', ondelete='CASCADE'),
+                         nullable=False)
+
+    # Version of the table once the change was made
+    version = db.Column(db.Integer, nullable=False)
+    change_type = db.Column(db.Text, nullable=False)
+
+    # JSON, the same as the 'data' of the realtime events
+    data = db.Column(db.Text, nullable=False)
+
+    def to_dict(self):
+        return {'version': self.version,
+                'type': self.change_type,
+                'data': JSON_ENCODER.loads(self.data)}
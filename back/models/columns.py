@@ -1,14 +1,25 @@
+from sqlalchemy import and_, or_
 from database import DATABASE as db
 from models.tasks import Tasks
+from pagination import encode_cursor
+from ranking import place, rebalance_later, spread
 
 
 class Columns(db.Model):
     __tablename__ = "columns"
+    __table_args__ = (db.Index('ix_columns_table_id_name', 'table_id', 'name',
+                               unique=True),
+                      db.Index('ix_columns_table_id_position', 'table_id',
+                               'position'))
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.Text, nullable=False)
     table_id = db.Column(db.Integer, db.ForeignKey('tables.id'))
+
+    # Rank of the column in its table, see ranking.py
+    position = db.Column(db.Text, nullable=False, default='')
     tasks = db.relationship('Tasks', backref=db.backref('column'),
-                            cascade='all,delete', lazy=True)
+                            cascade='all,delete', lazy=True,
+                            order_by=[Tasks.position, Tasks.id])
 
     def get_name(self):
         '''Return the column's name.'''
@@ -28,12 +39,35 @@ class Columns(db.Model):
             return (self.tasks, "Found")
         return (None, "You don't have any tasks yet")
 
+    def get_tasks_page(self, after, limit):
+        '''Return the tasks following the sort key after, at most limit of
+           them, and the cursor of the next page or None if it is the last.'''
+        query = Tasks.query.filter(Tasks.column_id == self.id)
+
+        if after:
+            position, id = after
+            query = query.filter(or_(Tasks.position > position,
+                                     and_(Tasks.position == position,
+                                          Tasks.id > id)))
+        tasks = (query.order_by(Tasks.position, Tasks.id)
+                 .limit(limit + 1).all())
+
+        if len(tasks) > limit:
+            last = tasks[limit - 1]
+            return (tasks[:limit], encode_cursor(last.position, last.id))
+        return (tasks, None)
+
     def add_task(self, description):
         '''Add a task to the column.'''
         if description:
-            task = Tasks(description=description, column_id=self.id)
+            position = place(Tasks.query.filter_by(column_id=self.id),
+                             Tasks.position)
+            task = Tasks(description=description, column_id=self.id,
+                         position=position)
             db.session.add(task)
+            self.table.touch('task_added', task.to_dict)
             db.session.commit()
+            rebalance_later(position, rebalance_column, self.id)
 
             return (task, "Task successfully added")
         return (None, "You did not give a description to the task")
@@ -44,23 +78,97 @@ class Columns(db.Model):
 
         if task:
             db.session.delete(task)
+            self.table.touch('task_deleted',
+                             {'id': task.id, 'column_id': self.id})
             db.session.commit()
             return True
         return False
 
-    def move_task_to(self, task_id, column):
-        '''Move the task matching id to a new column.'''
-        task, _ = self.get_task_by_id(task_id)
+    def move_task_to(self, task_id, column, after_id=None, before_id=None):
+        '''Move the task matching id to a new column, right after the task
+           matching after_id or right before the one matching before_id, at
+           the end of the column if neither is given. The column can be this
+           one to reorder its tasks.
+
+           The task keeps its id, it is moved by a single UPDATE that only
+           matches while the task still belongs to this column, none of the
+           other tasks is touched.'''
+        if not column:
+            return None
+
+        siblings = Tasks.query.filter(Tasks.column_id == column.id,
+                                      Tasks.id != task_id)
+        after = before = None
+
+        if after_id is not None:
+            after = (siblings.filter(Tasks.id == after_id)
+                     .with_entities(Tasks.position).scalar())
+
+            if after is None:
+                return None
+        elif before_id is not None:
+            before = (siblings.filter(Tasks.id == before_id)
+                      .with_entities(Tasks.position).scalar())
+
+            if before is None:
+                return None
+
+        position = place(siblings, Tasks.position, after=after, before=before)
+        moved = (Tasks.query
+                 .filter_by(id=task_id, column_id=self.id)
+                 .update({'column_id': column.id, 'position': position},
+                         synchronize_session='evaluate'))
 
-        if task and column:
-            new_task, _ = column.add_task(task.get_description())
-            self.remove_task_by_id(task_id)
-            return new_task
+        if moved:
+            self.table.touch('task_moved', lambda: dict(
+                Tasks.query.get(task_id).to_dict(), from_column_id=self.id))
+        db.session.commit()
+
+        if moved:
+            rebalance_later(position, rebalance_column, column.id)
+            return Tasks.query.get(task_id)
         return None
 
-    def to_dict(self):
+    def rebalance_tasks(self):
+        '''Give the column's tasks evenly spaced ranks, keeping their order.'''
+        ids = [id for id, in (db.session.query(Tasks.id)
+                              .filter_by(column_id=self.id)
+                              .order_by(Tasks.position, Tasks.id))]
+        positions = dict(zip(ids, spread(len(ids))))
+        db.session.bulk_update_mappings(
+            Tasks, [{'id': id, 'position': position}
+                    for id, position in positions.items()])
+        self.table.touch('tasks_rebalanced', {'column_id': self.id,
+                                              'positions': positions})
+        db.session.commit()
+
+    def to_dict(self, tasks=None):
+        if tasks is None:
+            tasks = self.tasks
         return {'id': self.id,
                 'name': self.name,
                 'table_id': self.table_id,
-                'tasks': [task.to_dict() for task in self.tasks],
+                'position': self.position,
+                'tasks': [task.to_dict() for task in tasks],
                 }
+
+    def to_compact_dict(self, tasks=None):
+        '''Same as to_dict, the fields of the tasks being sent as parallel
+           lists and their column_id left out, see Tables.to_compact_dict.'''
+        if tasks is None:
+            tasks = self.tasks
+        return {'id': self.id,
+                'name': self.name,
+                'position': self.position,
+                'tasks': {'id': [task.id for task in tasks],
+                          'description': [task.description for task in tasks],
+                          'position': [task.position for task in tasks]},
+                }
+
+
+def rebalance_column(column_id):
+    '''Rebalance the ranks of the tasks of the column matching id.'''
+    column = Columns.query.get(column_id)
+
+    if column:
+        column.rebalance_tasks()
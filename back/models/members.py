@@ -3,10 +3,13 @@ from database import DATABASE as db
 
 class Members(db.Model):
     __tablename__ = "members"
+    __table_args__ = (db.Index('ix_members_table_id_user_id', 'table_id',
+                               'user_id', unique=True),)
     id = db.Column(db.Integer, primary_key=True)
     table_id = db.Column(db.Integer, db.ForeignKey('tables.id'),
                          nullable=False)
-    user_id = db.Column(db.Text, db.ForeignKey('users.email'), nullable=False)
+    user_id = db.Column(db.Text, db.ForeignKey('users.email'), nullable=False,
+                        index=True)
 
     # Can be either 'creator', 'admin', 'editor' or 'visitor'
     role = db.Column(db.String(20), nullable=False)
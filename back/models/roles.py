@@ -0,0 +1,59 @@
+import enum
+from flask import g, has_app_context
+from database import DATABASE as db
+from models.members import Members
+
+
+class Role(enum.Enum):
+    '''Role of a user on a table.'''
+    NONE = 'none'
+    VISITOR = 'visitor'
+    EDITOR = 'editor'
+    ADMIN = 'admin'
+    CREATOR = 'creator'
+
+    def can_edit(self):
+        '''Return True if the role allows to change columns and tasks.'''
+        return self in (Role.CREATOR, Role.ADMIN, Role.EDITOR)
+
+    def can_manage(self):
+        '''Return True if the role allows to change the table's members.'''
+        return self in (Role.CREATOR, Role.ADMIN)
+
+
+def _request_cache():
+    '''Return the roles already resolved during the current request.'''
+    if not has_app_context():
+        return {}
+    if '_roles' not in g:
+        g._roles = {}
+    return g._roles
+
+
+def resolve_role(table, email):
+    '''Return the role of the user matching email on the table.
+
+       The creator is recognized without touching the database, any other
+       user costs a single lookup on the members of the table, which is then
+       remembered until the end of the request.'''
+    if not email:
+        return Role.NONE
+    if table.creator == email:
+        return Role.CREATOR
+    if not table.shared:
+        return Role.NONE
+
+    cache = _request_cache()
+    key = (table.id, email)
+
+    if key not in cache:
+        role = (db.session.query(Members.role)
+                .filter_by(table_id=table.id, user_id=email)
+                .first())
+        cache[key] = Role(role[0]) if role else Role.NONE
+    return cache[key]
+
+
+def forget_role(table, email):
+    '''Drop the remembered role of the user after it has been changed.'''
+    _request_cache().pop((table.id, email), None)
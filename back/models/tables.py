@@ -1,23 +1,50 @@
+from sqlalchemy import and_, func
+from sqlalchemy.orm import selectinload
 from database import DATABASE as db
-from models.columns import Columns as Cols
+from board_cache import BOARD_CACHE
+from change_log import CHANGE_LOG
+from models.columns import Columns as Cols, rebalance_column
 from models.members import Members
+from models.tasks import Tasks
+from models.roles import Role, resolve_role, forget_role
+from pagination import encode_cursor, MIN_INTEGER, MAX_INTEGER
+from ranking import place, rank_between, rebalance_later, spread
+
+# Version of the representation returned by Tables.to_compact_dict, bumped
+# whenever its layout changes
+COMPACT_FORMAT = 1
 
 
 class Tables(db.Model):
     __tablename__ = "tables"
+    # Ids are never reused: the cached boards, the ETags and the realtime
+    # rooms of a deleted table must not apply to the next one created
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.Text, nullable=False, unique=True)
-    creator = db.Column(db.Text, db.ForeignKey('users.email'), nullable=False)
+    creator = db.Column(db.Text, db.ForeignKey('users.email'), nullable=False,
+                        index=True)
     columns = db.relationship('Columns', backref='table',
-                              cascade='all,delete', lazy=True)
+                              cascade='all,delete', lazy=True,
+                              order_by=[Cols.position, Cols.id])
     shared = db.Column(db.Boolean, nullable=False, default=False)
     members = db.relationship('Members', backref='table',
                               cascade='all,delete', lazy=True)
+    version = db.Column(db.Integer, nullable=False, default=0,
+                        server_default='0')
 
     def get_name(self):
         '''Return the table's name.'''
         return self.name
 
+    def touch(self, change_type, data=None):
+        '''Bump the table's version, every change made to the table calls it
+           before being committed, with the type and data of the change for
+           the change log.'''
+        self.version = Tables.version + 1
+        BOARD_CACHE.invalidate(self.id)
+        CHANGE_LOG.record(self, change_type, {} if data is None else data)
+
     def get_creator(self):
         '''Return the table's creator.'''
         return self.creator
@@ -48,14 +75,19 @@ class Tables(db.Model):
 
     def add_column(self, name, current_user_email):
         '''Add a column to the table.'''
-        if self.creator == current_user_email or (self.get_member_by_email(current_user_email) and self.get_member_by_email(current_user_email).get_member_role() in ("admin", "editor")):
+        if self.get_role(current_user_email).can_edit():
             if name:
-                column = Cols(name=name, table_id=self.id)
                 is_column, _ = self.get_column_by_name(name)
 
                 if not is_column:
+                    position = place(Cols.query.filter_by(table_id=self.id),
+                                     Cols.position)
+                    column = Cols(name=name, table_id=self.id,
+                                  position=position)
                     db.session.add(column)
+                    self.touch('column_added', column.to_dict)
                     db.session.commit()
+                    rebalance_later(position, rebalance_table, self.id)
                     return (column, "Column '{}' successfully created".format(name))
                 return (None, "You already have a column with name: '{}'".format(name))
             return (None, "Looks like you did not give us a column name")
@@ -63,30 +95,196 @@ class Tables(db.Model):
 
     def delete_column_by_name(self, name, current_user_email):
         '''Remove the column from the list of the table's columns.'''
-        if self.creator == current_user_email or (self.get_member_by_email(current_user_email) and self.get_member_by_email(current_user_email).get_member_role() in ("admin", "editor")):
+        if self.get_role(current_user_email).can_edit():
             if name:
                 col = db.session.query(Cols).filter(Cols.name == name,
                                                     Cols.table_id == self.id).first()
 
                 if col:
                     db.session.delete(col)
+                    self.touch('column_deleted', {'name': name})
                     db.session.commit()
                     return (True, "'{}' successfully deleted".format(name))
                 return (False, "The column you want to delete does not exist")
             return (None, "Looks like you did not give us a column name")
         return (None, "You don't have the right to delete this column")
 
-    def get_member_by_email(self, email):
-        '''Return the member that matches the email or None if do not exist.'''
-        members, _ = self.get_members()
+    def apply_task_operations(self, operations, current_user_email):
+        '''Add, move and delete tasks of the table in a single transaction.
+
+           Each operation is a dict with an 'op' key:
+             {'op': 'add', 'column': name, 'description': text}
+             {'op': 'move', 'task_id': id, 'move_to': column name}
+             {'op': 'delete', 'task_id': id}
+           Return one result per operation, the invalid ones are reported
+           and skipped while the others are applied.'''
+        if not self.get_role(current_user_email).can_edit():
+            return (None, "You don't have the right to change the tasks")
+
+        columns = dict(db.session.query(Cols.name, Cols.id)
+                       .filter_by(table_id=self.id))
+        # Ids too wide for the database can't match any task
+        task_ids = {op.get('task_id') for op in operations
+                    if isinstance(op, dict) and type(op.get('task_id')) is int
+                    and MIN_INTEGER <= op['task_id'] <= MAX_INTEGER}
+        task_columns = {}
+
+        for chunk in _chunks(list(task_ids)):
+            task_columns.update(db.session.query(Tasks.id, Tasks.column_id)
+                                .filter(Tasks.id.in_(chunk),
+                                        Tasks.column_id.in_(columns.values())))
+
+        results = []
+        added = []
+        moved = {}
+        deleted = set()
+
+        for index, op in enumerate(operations):
+            if not isinstance(op, dict):
+                results.append({'index': index, 'ok': False,
+                                'message': 'Invalid operation'})
+                continue
+
+            kind = op.get('op')
+            task_id = op.get('task_id')
+
+            if kind == 'add':
+                if not isinstance(op.get('column'), str) or op['column'] not in columns:
+                    message = "Column '{}' not found".format(op.get('column'))
+                elif not op.get('description') or not isinstance(op['description'], str):
+                    message = "You did not give a description to the task"
+                else:
+                    task = {'description': op['description'],
+                            'column_id': columns[op['column']]}
+                    added.append(task)
+                    results.append({'index': index, 'ok': True, 'op': kind,
+                                    'task': task})
+                    continue
+            elif kind in ('move', 'delete'):
+                if type(task_id) is not int or task_id not in task_columns \
+                        or task_id in deleted:
+                    message = "Task not found"
+                elif kind == 'move' and (not isinstance(op.get('move_to'), str)
+                                         or op['move_to'] not in columns):
+                    message = "Column '{}' not found".format(op.get('move_to'))
+                else:
+                    result = {'index': index, 'ok': True, 'op': kind,
+                              'task_id': task_id}
+
+                    if kind == 'move':
+                        result['column_id'] = columns[op['move_to']]
+                        moved[task_id] = result
+                    else:
+                        moved.pop(task_id, None)
+                        deleted.add(task_id)
+                    results.append(result)
+                    continue
+            else:
+                message = "Unknown operation '{}'".format(kind)
+            results.append({'index': index, 'ok': False, 'message': message})
+
+        # Added and moved tasks go at the end of their column, in the order
+        # of the operations
+        placed = [result.get('task', result) for result in results
+                  if result.get('op') == 'add' or (
+                      result.get('op') == 'move'
+                      and moved.get(result['task_id']) is result)]
+        ends = {}
+
+        for task in placed:
+            column_id = task['column_id']
+
+            if column_id in ends:
+                ends[column_id] = rank_between(ends[column_id], None)
+            else:
+                ends[column_id] = place(Tasks.query.filter_by(column_id=column_id),
+                                        Tasks.position)
+            task['position'] = ends[column_id]
+
+        if added:
+            db.session.bulk_insert_mappings(Tasks, added, return_defaults=True)
+
+        if moved:
+            db.session.bulk_update_mappings(
+                Tasks, [{'id': task_id,
+                         'column_id': result['column_id'],
+                         'position': result['position']}
+                        for task_id, result in moved.items()])
+
+        for chunk in _chunks(list(deleted)):
+            (Tasks.query.filter(Tasks.id.in_(chunk))
+             .delete(synchronize_session=False))
+
+        if added or moved or deleted:
+            self.touch('tasks_changed',
+                       lambda: [result for result in results if result['ok']])
+        db.session.commit()
+
+        for column_id, position in ends.items():
+            rebalance_later(position, rebalance_column, column_id)
+        return (results, "Done")
+
+    def move_column(self, column_id, current_user_email, after_id=None,
+                    before_id=None):
+        '''Move the column matching id right after the column matching
+           after_id or right before the one matching before_id, last if
+           neither is given. Only the moved column is updated.'''
+        if not self.get_role(current_user_email).can_edit():
+            return (None, "You don't have the right to move this column")
+
+        column, status = self.get_column_by_id(column_id)
+
+        if not column:
+            return (None, status)
+
+        siblings = Cols.query.filter(Cols.table_id == self.id,
+                                     Cols.id != column.id)
+        after = before = None
+
+        if after_id is not None:
+            after = (siblings.filter(Cols.id == after_id)
+                     .with_entities(Cols.position).scalar())
+
+            if after is None:
+                return (None, "Column not found")
+        elif before_id is not None:
+            before = (siblings.filter(Cols.id == before_id)
+                      .with_entities(Cols.position).scalar())
+
+            if before is None:
+                return (None, "Column not found")
+
+        column.position = place(siblings, Cols.position, after=after,
+                                before=before)
+        self.touch('column_moved', {'id': column.id,
+                                    'position': column.position})
+        db.session.commit()
+        rebalance_later(column.position, rebalance_table, self.id)
+        return (column, "Column moved")
+
+    def rebalance_columns(self):
+        '''Give the table's columns evenly spaced ranks, keeping their order.'''
+        ids = [id for id, in (db.session.query(Cols.id)
+                              .filter_by(table_id=self.id)
+                              .order_by(Cols.position, Cols.id))]
+        positions = dict(zip(ids, spread(len(ids))))
+        db.session.bulk_update_mappings(
+            Cols, [{'id': id, 'position': position}
+                   for id, position in positions.items()])
+        self.touch('columns_rebalanced', {'positions': positions})
+        db.session.commit()
+
+    def get_role(self, email):
+        '''Return the role of the user matching email on the table.'''
+        return resolve_role(self, email)
 
-        if not members:
+    def get_member_by_email(self, email):
+        '''Return the member that matches the email or None if do not exist.
+           A single lookup on the (table_id, user_id) index, the table's
+           members are not loaded.'''
+        if not self.shared or not email:
             return None
-
-        for member in members:
-            if member.get_member_id() == email:
-                return member
-        return None
+        return Members.query.filter_by(table_id=self.id, user_id=email).first()
 
     def get_members(self):
         '''Return table's members if the table is shared,
@@ -98,7 +296,7 @@ class Tables(db.Model):
 
     def add_member(self, new_member_email, current_user_email):
         '''Add a column to the table.'''
-        if self.creator == current_user_email or (self.get_member_by_email(current_user_email) and self.get_member_by_email(current_user_email).get_member_role() == "admin"):
+        if self.get_role(current_user_email).can_manage():
             if self.shared and new_member_email:
                 if new_member_email == self.creator:
                     if self.get_member_by_email(new_member_email):
@@ -106,6 +304,7 @@ class Tables(db.Model):
                     member = Members(table_id=self.id,
                                      user_id=new_member_email, role='creator')
                     db.session.add(member)
+                    self.touch('member_added', member.to_dict)
                     db.session.commit()
                     return (member, "Ok")
                 else:
@@ -117,6 +316,9 @@ class Tables(db.Model):
                 if is_member:
                     return (None, " '{}' is already a member".format(new_member_email))
 
+                # Added, and the change logged with touch(), by the caller
+                # once it knows the new member has an account
+                forget_role(self, new_member_email)
                 return (member, "Ok")
 
             return (None, '''Looks like you did not give us an email,
@@ -126,7 +328,7 @@ class Tables(db.Model):
 
     def delete_member_by_email(self, email, current_user_email):
         '''Remove a member from the list of the table's members.'''
-        if self.creator == current_user_email or (self.get_member_by_email(current_user_email) and self.get_member_by_email(current_user_email).get_member_role() == "admin"):
+        if self.get_role(current_user_email).can_manage():
           if email == self.creator:
               return (False, 'You cannot delete the creator')
 
@@ -136,14 +338,16 @@ class Tables(db.Model):
 
           if member:
               db.session.delete(member)
+              self.touch('member_deleted', {'member_email': email})
               db.session.commit()
+              forget_role(self, email)
               return (True, "member deleted")
           return (False, "something went wrong, please try again later")
         return (False, "You don't have the right to add new members")
 
     def set_member_as_admin(self, member_email, current_user_email):
       '''Grant member with admin privileges'''
-      if self.creator == current_user_email or (self.get_member_by_email(current_user_email) and self.get_member_by_email(current_user_email).get_member_role() == "admin"):
+      if self.get_role(current_user_email).can_manage():
         if member_email == self.creator:
               return (False, 'You cannot change the status of the creator')
         
@@ -153,14 +357,16 @@ class Tables(db.Model):
         if member:
             member.set_member_role("admin")
             db.session.add(member)
+            self.touch('member_role_changed', member.to_dict)
             db.session.commit()
+            forget_role(self, member_email)
             return (True, "{} granted 'admin' privileges".format(member_email))
         return (False, "something went wrong, please try again later")
       return (False, "You don't have the right to change member's role on this table")
 
     def set_member_as_editor(self, member_email, current_user_email):
       '''Grant member with editor privileges'''
-      if self.creator == current_user_email or (self.get_member_by_email(current_user_email) and self.get_member_by_email(current_user_email).get_member_role() == "admin"):
+      if self.get_role(current_user_email).can_manage():
         if member_email == self.creator:
               return (False, 'You cannot change the status of the creator')
         
@@ -170,7 +376,9 @@ class Tables(db.Model):
         if member:
             member.set_member_role("editor")
             db.session.add(member)
+            self.touch('member_role_changed', member.to_dict)
             db.session.commit()
+            forget_role(self, member_email)
             return (True, "{} granted 'editor' privileges".format(member_email))
         return (False, "something went wrong, please try again later")
       return (False, "You don't have the right to change member's role on this table")
@@ -178,7 +386,7 @@ class Tables(db.Model):
 
     def set_member_as_visitor(self, member_email, current_user_email):
       '''Grant member with visitor privileges'''
-      if self.creator == current_user_email or (self.get_member_by_email(current_user_email) and self.get_member_by_email(current_user_email).get_member_role() == "admin"):
+      if self.get_role(current_user_email).can_manage():
         if member_email == self.creator:
               return (False, 'You cannot change the status of the creator')
         
@@ -188,7 +396,9 @@ class Tables(db.Model):
         if member:
             member.set_member_role("visitor")
             db.session.add(member)
+            self.touch('member_role_changed', member.to_dict)
             db.session.commit()
+            forget_role(self, member_email)
             return (True, "{} granted 'visitor' privileges".format(member_email))
         return (False, "something went wrong, please try again later")
       return (False, "You don't have the right to change member's role on this table")
@@ -198,6 +408,7 @@ class Tables(db.Model):
         if not self.shared:
             self.shared = True
             self.add_member(current_user_email, current_user_email)
+            self.touch('table_shared')
             db.session.commit()
 
     def rename(self, name):
@@ -208,22 +419,148 @@ class Tables(db.Model):
 
             if table is None:
                 self.name = name
+                self.touch('table_renamed', {'name': name})
                 db.session.commit()
                 return (self, "Updated successfully !")
             return (None, "A table with name: '{}' already exists".format(name))
         return (None, "Looks like you did not give us a table name")
 
-    def to_dict(self, current_user_email):
-        member = self.get_member_by_email(current_user_email)
+    def to_dict(self, current_user_email, columns=None):
+        if columns is None:
+            columns = [col.to_dict() for col in self.columns]
 
-        if member:
-            current_user_role = member.get_member_role()
-        else:
-            current_user_role = 'visitor'
+        # Only the members of a shared table have their role shown
+        role = (self.get_role(current_user_email) if self.shared
+                else Role.NONE)
+        current_user_role = 'visitor' if role is Role.NONE else role.value
         return {'id': self.id,
                 'name': self.name,
                 'creator': self.creator,
-                'columns': [col.to_dict() for col in self.columns],
+                'columns': columns,
                 'members': [memb.to_dict() for memb in self.members],
-                'current_user_role': current_user_role
+                'current_user_role': current_user_role,
+                'version': self.version
                 }
+
+    def to_compact_dict(self, current_user_email, columns=None):
+        '''Same as to_dict, in a smaller representation for large boards.
+
+           The tasks of every column and the members of the table are sent as
+           parallel lists, one per field, instead of one object each. Their
+           column_id and table_id are left out, the members' emails and roles
+           are indexes in the 'emails' and 'roles' lists. 'format' holds the
+           version of the layout.'''
+        if columns is None:
+            columns = [col.to_compact_dict() for col in self.columns]
+
+        emails = {}
+        roles = {}
+        members = {'id': [], 'email': [], 'role': []}
+
+        for memb in self.members:
+            members['id'].append(memb.id)
+            members['email'].append(emails.setdefault(memb.user_id,
+                                                      len(emails)))
+            members['role'].append(roles.setdefault(memb.role, len(roles)))
+
+        board = self.to_dict(current_user_email, columns=columns)
+        board.update({'format': COMPACT_FORMAT,
+                      'emails': list(emails),
+                      'roles': list(roles),
+                      'members': members})
+        return board
+
+    def to_skeleton_dict(self, current_user_email, page_size, compact=False):
+        '''Same as to_dict, but every column only holds the first page of its
+           tasks, along with its task count and the cursor of the next page.
+           With compact, same as to_compact_dict.
+
+           The counts and the first pages of every column are read with one
+           query each, the table should be loaded without its tasks.'''
+        column_ids = [col.id for col in self.columns]
+        counts = dict(db.session.query(Tasks.column_id, func.count(Tasks.id))
+                      .filter(Tasks.column_id.in_(column_ids))
+                      .group_by(Tasks.column_id))
+        rank = (func.row_number()
+                .over(partition_by=Tasks.column_id,
+                      order_by=(Tasks.position, Tasks.id))
+                .label('rank'))
+        ranked = (db.session.query(Tasks.id.label('id'), rank)
+                  .filter(Tasks.column_id.in_(column_ids))
+                  .subquery())
+        pages = {}
+
+        for task in (Tasks.query.join(ranked, ranked.c.id == Tasks.id)
+                     .filter(ranked.c.rank <= page_size)
+                     .order_by(Tasks.column_id, Tasks.position, Tasks.id)):
+            pages.setdefault(task.column_id, []).append(task)
+
+        columns = []
+
+        for col in self.columns:
+            tasks = pages.get(col.id, [])
+            count = counts.get(col.id, 0)
+            column = (col.to_compact_dict(tasks=tasks) if compact
+                      else col.to_dict(tasks=tasks))
+            column['task_count'] = count
+            column['next_cursor'] = (encode_cursor(tasks[-1].position,
+                                                   tasks[-1].id)
+                                     if count > len(tasks) else None)
+            columns.append(column)
+
+        if compact:
+            return self.to_compact_dict(current_user_email, columns=columns)
+        return self.to_dict(current_user_email, columns=columns)
+
+
+def rebalance_table(table_id):
+    '''Rebalance the ranks of the columns of the table matching id.'''
+    table = Tables.query.get(table_id)
+
+    if table:
+        table.rebalance_columns()
+
+
+def load_board(table_id, with_tasks=True):
+    '''Return the table matching id with its columns, their tasks and its
+       members loaded up front, so that serializing the board costs a fixed
+       number of queries whatever its size.'''
+    columns = selectinload(Tables.columns)
+
+    if with_tasks:
+        columns = columns.selectinload(Cols.tasks)
+    return (Tables.query
+            .options(columns, selectinload(Tables.members))
+            .populate_existing()
+            .filter_by(id=table_id)
+            .first())
+
+
+def get_board_state(name, email):
+    '''Return the id, version and the user's role of the table matching name
+       if the user can see it, None otherwise.
+
+       It costs a single lookup on the unique name index joined to the user's
+       membership, none of the table's columns, tasks or members is loaded.'''
+    row = (db.session.query(Tables.id, Tables.version, Tables.creator,
+                            Tables.shared, Members.role)
+           .outerjoin(Members, and_(Members.table_id == Tables.id,
+                                    Members.user_id == email))
+           .filter(Tables.name == name)
+           .first())
+
+    if not row:
+        return None
+
+    table_id, version, creator, shared, role = row
+    is_member = shared and role is not None
+
+    if creator != email and not is_member:
+        return None
+    return (table_id, version, role if is_member else 'visitor')
+
+
+def _chunks(values, size=500):
+    '''Split values in lists small enough for an SQL IN clause.'''
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
@@ -3,10 +3,15 @@ from database import DATABASE as db
 
 class Tasks(db.Model):
     __tablename__ = "tasks"
+    __table_args__ = (db.Index('ix_tasks_column_id_position', 'column_id',
+                               'position'),)
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.Text, nullable=False)
     column_id = db.Column(db.Integer, db.ForeignKey('columns.id'))
 
+    # Rank of the task in its column, see ranking.py
+    position = db.Column(db.Text, nullable=False, default='')
+
     def get_id(self):
         '''Return the task's id.'''
         return self.id
@@ -18,4 +23,5 @@ class Tasks(db.Model):
     def to_dict(self):
         return {'id': self.id,
                 'description': self.description,
-                'column_id': self.column_id}
+                'column_id': self.column_id,
+                'position': self.position}
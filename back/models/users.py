@@ -1,8 +1,15 @@
 import flask_login
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import exc
+from sqlalchemy import and_, event, exc, literal_column, or_
+from sqlalchemy.orm import make_transient_to_detached
 from database import DATABASE as db
+from board_cache import BOARD_CACHE
+from hashing import PASSWORD_HASHER, HasherBusy
+from pagination import encode_cursor
+from search import TASKS_FTS, match_query
+from user_cache import USER_CACHE
 from models.tables import Tables
+from models.members import Members
+from models.roles import Role
 
 
 class Users(db.Model, flask_login.UserMixin):
@@ -16,11 +23,11 @@ class Users(db.Model, flask_login.UserMixin):
 
     def set_password(self, password):
         '''Set the user's password.'''
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = PASSWORD_HASHER.hash(password)
 
     def check_password(self, password):
         '''Check if the provided password and the user's password match.'''
-        return check_password_hash(self.password_hash, password)
+        return PASSWORD_HASHER.verify(self.password_hash, password)
 
     def get_id(self):
         '''Return the user's email.'''
@@ -33,64 +40,125 @@ class Users(db.Model, flask_login.UserMixin):
     def get_table_by_id(self, id):
         ''' Return corresponding table, mostly used when retrieveing a
             table shared with the user'''
-        if self.membership:
-            table, _ = self.get_tables_shared_with_me()
+        table = (Tables.query
+                 .join(Members, Members.table_id == Tables.id)
+                 .filter(Tables.id == id,
+                         Members.user_id == self.email,
+                         Tables.creator != self.email)
+                 .first())
 
-            for t in table:
-                if t.id == id:
-                    return (t, 'Found')
-
-            return (None, 'Not found')
+        if table:
+            return (table, 'Found')
         return (None, 'Not found')
 
     def get_table_by_name(self, name):
         '''Return the table that matches the name provided.'''
-        table = Tables.query.filter_by(name=name, creator=self.email).first()
-
-        if table:
-            return (table, "Table '{}' found".format(name))
-
         table = Tables.query.filter_by(name=name).first()
 
-        if table and table.get_member_by_email(self.email):
+        if table and table.get_role(self.email) is not Role.NONE:
             return (table, "Table '{}' found".format(name))
 
         return (None, "Table '{}' not found".format(name))
 
-    def get_private_tables(self):
-        '''Return a list of the user's private tables.'''
-        if self.tables:
-            table = [t for t in self.tables if not t.shared]
+    def get_private_tables(self, after=None, limit=None):
+        '''Return a list of the user's private tables, the ones following the
+           sort key after and at most limit of them if given.'''
+        table = _page(Tables.query.filter_by(creator=self.email, shared=False),
+                      after, limit)
 
-            if table:
-                return (table, "Found")
-            return (None, "You don't have any private table yet")
+        if table:
+            return (table, "Found")
         return (None, "You don't have any private table yet")
 
-    def get_tables_shared_with_others(self):
-        '''Return a list of the user's shared tables.'''
-        if self.tables:
-            table = [t for t in self.tables if t.shared]
+    def get_tables_shared_with_others(self, after=None, limit=None):
+        '''Return a list of the user's shared tables, the ones following the
+           sort key after and at most limit of them if given.'''
+        table = _page(Tables.query.filter_by(creator=self.email, shared=True),
+                      after, limit)
 
-            if table:
-                return (table, "Found")
-            return (None, "You did not share any table yet")
+        if table:
+            return (table, "Found")
         return (None, "You did not share any table yet")
 
-    def get_tables_shared_with_me(self):
-        '''Return a list of the tables shared with the user.'''
-        table = []
+    def get_tables_shared_with_me(self, after=None, limit=None):
+        '''Return a list of the tables shared with the user, the ones
+           following the sort key after and at most limit of them if given.'''
+        table = _page(Tables.query
+                      .join(Members, Members.table_id == Tables.id)
+                      .filter(Members.user_id == self.email,
+                              Tables.creator != self.email),
+                      after, limit)
 
-        if self.membership:
-            for m in self.membership:
-                t = Tables.query.filter_by(id=m.get_table_id()).first()
-
-                if t and t.creator != self.email:
-                    table.append(t)
         if table:
             return (table, "Found")
         return (None, "No table shared with you")
 
+    def get_dashboard(self):
+        '''Return the names of the user's private tables, of the tables the
+           user shares with others and of the tables shared with the user.
+
+           A single statement reads only the columns needed, the user's own
+           tables and the tables the user is a member of are each found
+           through their index.'''
+        own = (db.session.query(Tables.id, Tables.name, Tables.shared,
+                                Tables.creator)
+               .filter(Tables.creator == self.email))
+        shared_with_me = (db.session.query(Tables.id, Tables.name,
+                                           Tables.shared, Tables.creator)
+                          .join(Members, Members.table_id == Tables.id)
+                          .filter(Members.user_id == self.email,
+                                  Tables.creator != self.email))
+        dashboard = {'private_tables': [],
+                     'tables_shared_with_others': [],
+                     'tables_shared_with_me': []}
+
+        for _, name, shared, creator in own.union_all(shared_with_me):
+            if creator != self.email:
+                dashboard['tables_shared_with_me'].append(name)
+            elif shared:
+                dashboard['tables_shared_with_others'].append(name)
+            else:
+                dashboard['private_tables'].append(name)
+        return dashboard
+
+    def search_tasks(self, words, after, limit):
+        '''Return the tasks of the tables the user can see that contain all
+           the words, best matches first, the ones following the sort key
+           after and at most limit of them, and the cursor of the next page
+           or None if it is the last.'''
+        own = db.session.query(Tables.id).filter(Tables.creator == self.email)
+        member_of = (db.session.query(Members.table_id)
+                     .filter(Members.user_id == self.email))
+        table_ids = [id for id, in own.union(member_of)]
+
+        if not table_ids:
+            return ([], None)
+
+        fts = TASKS_FTS.c
+        match = match_query(words, table_ids)
+        query = (db.session.query(fts.rowid, fts.description, fts.column_id,
+                                  fts.column_name, fts.table_id,
+                                  fts.table_name, fts.rank)
+                 .select_from(TASKS_FTS)
+                 .filter(literal_column('tasks_fts').op('MATCH')(match)))
+
+        if after:
+            rank, id = after
+            query = query.filter(or_(fts.rank > rank,
+                                     and_(fts.rank == rank, fts.rowid > id)))
+        rows = query.order_by(fts.rank, fts.rowid).limit(limit + 1).all()
+        tasks = [{'id': row.rowid,
+                  'description': row.description,
+                  'column_id': row.column_id,
+                  'column_name': row.column_name,
+                  'table_id': row.table_id,
+                  'table_name': row.table_name} for row in rows[:limit]]
+
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            return (tasks, encode_cursor(last.rank, last.rowid))
+        return (tasks, None)
+
     def add_table(self, name):
         '''Create a new table if it doesn't already exists.'''
         if name:
@@ -112,6 +180,7 @@ class Users(db.Model, flask_login.UserMixin):
         if table:
             db.session.delete(table)
             db.session.commit()
+            BOARD_CACHE.invalidate(table.id)
             return True
         return False
 
@@ -121,12 +190,36 @@ class Users(db.Model, flask_login.UserMixin):
                 }
 
 
+@event.listens_for(Users, 'after_update')
+@event.listens_for(Users, 'after_delete')
+def _forget_user(mapper, connection, user):
+    USER_CACHE.invalidate(user.email)
+
+
+BUSY_MESSAGE = "Too many people are signing in right now, please try again"
+
+
+def _page(query, after, limit):
+    '''Return the tables of the query ordered by id, following the sort key
+       after and at most limit of them if given.'''
+    if after:
+        query = query.filter(Tables.id > after[0])
+    query = query.order_by(Tables.id)
+
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
 
 def add_user(email, username, password):
     '''Create a new user.'''
     if email and username and password:
-        user = Users(email=email, username=username, password_hash=password)
-        user.set_password(password)
+        user = Users(email=email, username=username)
+
+        try:
+            user.set_password(password)
+        except HasherBusy:
+            return (None, BUSY_MESSAGE)
 
         try:
             db.session.add(user)
@@ -140,12 +233,46 @@ def add_user(email, username, password):
     return (None, "Make sure you've filled all the credentials asked")
 
 
+def get_user(email):
+    '''Return the user matching email, without querying the database when
+       the user is in the identity cache.'''
+    values = USER_CACHE.get(email)
+
+    if values is None:
+        user = Users.query.get(email)
+
+        if user is not None:
+            USER_CACHE.put(email, {'email': user.email,
+                                   'username': user.username,
+                                   'password_hash': user.password_hash})
+        return user
+
+    # Attach a copy of the cached user to the session as if it had just
+    # been loaded, its relationships are still loaded on access.
+    user = Users(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
 def retrieve_user(email, password):
     '''Return the user that matches the credentials.'''
     if email and password:
         user = Users.query.get(email)
 
-        if user is None or not user.check_password(password):
+        if user is None:
+            return (None, "Authentication failed")
+
+        try:
+            matches, new_hash = PASSWORD_HASHER.verify_and_update(
+                user.password_hash, password)
+        except HasherBusy:
+            return (None, BUSY_MESSAGE)
+
+        if not matches:
             return (None, "Authentication failed")
+
+        if new_hash:
+            user.password_hash = new_hash
+            db.session.commit()
         return (user, "You're now logged in as {}".format(user.get_id()))
     return (None, "Make sure you've entered all credentials asked")
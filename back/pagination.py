@@ -0,0 +1,66 @@
+'''Keyset pagination helpers.
+
+A page is the rows that follow the last row of the previous page in the
+order of the listing, the cursor handed to the client is that row's sort
+key, encoded so that clients treat it as an opaque string.'''
+import base64
+import binascii
+import json
+from flask import current_app
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_MAX_PAGE_SIZE = 500
+
+# Range of the integers the database stores
+MIN_INTEGER = -2 ** 63
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def encode_cursor(*values):
+    '''Return the cursor pointing after the row whose sort key is values.'''
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    '''Return the sort key the cursor points after, or None if the cursor is
+       missing or invalid. types are those of the values of the sort key,
+       a tuple of types for a value that can be of any of them.'''
+    if not cursor:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, ValueError):
+        return None
+
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+
+    if not all(_is_valid(value, type_) for value, type_ in zip(values, types)):
+        return None
+    return values
+
+
+def _is_valid(value, types):
+    '''Return True if the value of a sort key is of the types and can be
+       compared with the database's values, booleans aren't integers and
+       integers must fit in 64 bits.'''
+    if isinstance(value, bool):
+        return False
+
+    if isinstance(value, int) and not MIN_INTEGER <= value <= MAX_INTEGER:
+        return False
+    return isinstance(value, types)
+
+
+def page_size(requested=None):
+    '''Return the page size to use, the configured default if none was
+       requested, never more than the configured maximum.'''
+    default = current_app.config.get('PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = current_app.config.get('MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+
+    if not requested or requested < 1:
+        return default
+    return min(requested, maximum)
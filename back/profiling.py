@@ -0,0 +1,240 @@
+'''Opt-in profiling of single requests, for operators.
+
+With PROFILING_ENABLED set, a request carrying the PROFILING_TOKEN in its
+X-Profile header, or the signature of its path in its 'profile' query
+parameter, runs under cProfile. What it did is saved in PROFILING_DIR:
+
+    <id>.prof  the pstats dump
+    <id>.json  the route, the table, the status and timing of the request,
+               along with the SQL statements it ran and their durations
+
+The capture's id is sent back in the X-Profile-Id header. Only one request
+is profiled at a time and at most PROFILING_PER_MINUTE of them a minute,
+the others are served as usual. Only the last PROFILING_KEEP captures are
+kept.
+
+The 'flask profiles', 'flask show-profile' and 'flask profile-link'
+commands list the captures, print one of them and give the signed link
+profiling a path.'''
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from collections import deque
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+DEFAULT_PER_MINUTE = 6
+DEFAULT_KEEP = 50
+DEFAULT_DIRECTORY = '.profiles'
+
+# Arguments of the routes naming or identifying the table
+TABLE_ARGUMENTS = ('name', 't_name', 'table_name', 'current_name')
+
+
+def sign(token, path):
+    '''Return the value of the 'profile' query parameter profiling path.'''
+    return hmac.new(token.encode('utf-8'), path.encode('utf-8'),
+                    hashlib.sha256).hexdigest()
+
+
+class Profiler:
+    '''Profiles the requests that ask for it.'''
+
+    def __init__(self):
+        self.enabled = False
+        self.token = None
+        self.directory = DEFAULT_DIRECTORY
+        self.per_minute = DEFAULT_PER_MINUTE
+        self.keep = DEFAULT_KEEP
+        self.captured = 0
+        self.refused = 0
+        self._recent = deque()
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, engine):
+        '''Read the settings and hook the application and its engine.'''
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.token = app.config.get('PROFILING_TOKEN')
+        self.directory = os.path.join(
+            app.root_path, app.config.get('PROFILING_DIR', DEFAULT_DIRECTORY))
+        self.per_minute = app.config.get('PROFILING_PER_MINUTE',
+                                         DEFAULT_PER_MINUTE)
+        self.keep = app.config.get('PROFILING_KEEP', DEFAULT_KEEP)
+
+        if not self.enabled or not self.token:
+            return
+
+        app.before_request(self._start)
+        app.after_request(self._tag)
+        app.teardown_request(self._stop)
+        event.listen(engine, 'before_cursor_execute', self._start_statement)
+        event.listen(engine, 'after_cursor_execute', self._end_statement)
+
+    def stats(self):
+        '''Return the number of captures made and refused.'''
+        with self._lock:
+            return {'captured': self.captured, 'refused': self.refused}
+
+    def captures(self):
+        '''Return the metadata of the captures, the most recent first.'''
+        if not os.path.isdir(self.directory):
+            return []
+
+        captures = []
+
+        for filename in sorted(os.listdir(self.directory), reverse=True):
+            if filename.endswith('.json'):
+                with open(os.path.join(self.directory, filename)) as meta:
+                    captures.append(json.load(meta))
+        return captures
+
+    def report(self, capture_id, sort='cumulative', limit=30):
+        '''Return the statistics and the SQL log of the capture as text.'''
+        path = os.path.join(self.directory, _safe(capture_id))
+
+        with open(path + '.json') as meta:
+            capture = json.load(meta)
+
+        out = io.StringIO()
+        stats = pstats.Stats(path + '.prof', stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        out.write('\n{} SQL statements, {:.1f} ms\n'.format(
+            len(capture['sql']),
+            sum(statement['seconds'] for statement in capture['sql']) * 1000))
+
+        for statement in capture['sql']:
+            out.write('\n-- {:.2f} ms\n{}\n'.format(statement['seconds'] * 1000,
+                                                  statement['statement']))
+        return out.getvalue()
+
+    def _requested(self):
+        header = request.headers.get('X-Profile')
+
+        if header:
+            return hmac.compare_digest(header, self.token)
+
+        signature = request.args.get('profile')
+        return bool(signature) and hmac.compare_digest(
+            signature, sign(self.token, request.path))
+
+    def _allowed(self):
+        '''Return True if a capture may start now.'''
+        now = time.monotonic()
+
+        with self._lock:
+            while self._recent and self._recent[0] < now - 60:
+                self._recent.popleft()
+
+            if len(self._recent) >= self.per_minute:
+                self.refused += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def _start(self):
+        if not self._requested():
+            return
+
+        # cProfile can't run twice at once, and it is what slows down
+        if not self._allowed() or not self._busy.acquire(blocking=False):
+            g._profile_refused = True
+            return
+
+        started = time.time()
+        capture_id = '{}{:03d}-{}'.format(
+            time.strftime('%Y%m%d-%H%M%S', time.gmtime(started)),
+            int(started * 1000) % 1000, _safe(request.endpoint or 'unmatched'))
+        profile = cProfile.Profile()
+        g._profile = {'id': capture_id, 'profile': profile, 'sql': [],
+                      'status': None, 'started': started,
+                      'clock': time.perf_counter()}
+        profile.enable()
+
+    def _tag(self, response):
+        if g.get('_profile_refused'):
+            response.headers['X-Profile-Id'] = 'refused'
+        elif '_profile' in g:
+            g._profile['status'] = response.status_code
+            response.headers['X-Profile-Id'] = g._profile['id']
+        return response
+
+    def _stop(self, exception):
+        capture = g.pop('_profile', None)
+
+        if capture is None:
+            return
+
+        capture['profile'].disable()
+        self._busy.release()
+        duration = time.perf_counter() - capture['clock']
+        capture_id = capture['id']
+        arguments = request.view_args or {}
+        table = next((arguments[key] for key in TABLE_ARGUMENTS
+                      if key in arguments), None)
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, capture_id)
+            capture['profile'].dump_stats(path + '.prof')
+
+            with open(path + '.json', 'w') as meta:
+                json.dump({'id': capture_id,
+                           'time': capture['started'],
+                           'method': request.method,
+                           'path': request.path,
+                           'route': (request.url_rule.rule if request.url_rule
+                                     else None),
+                           'table': table,
+                           'status': capture['status'] or 500,
+                           'seconds': duration,
+                           'sql': capture['sql']}, meta, indent=2)
+            self._prune()
+        except OSError:
+            current_app.logger.exception("Could not save profile %s",
+                                         capture_id)
+            return
+
+        with self._lock:
+            self.captured += 1
+
+    def _prune(self):
+        '''Remove the oldest captures beyond the ones to keep.'''
+        ids = sorted({filename.rsplit('.', 1)[0]
+                      for filename in os.listdir(self.directory)})
+
+        for capture_id in ids[:max(len(ids) - self.keep, 0)]:
+            for extension in ('.prof', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory,
+                                           capture_id + extension))
+                except FileNotFoundError:
+                    pass
+
+    def _start_statement(self, connection, cursor, statement, parameters,
+                         context, executemany):
+        connection.info['_profile_started'] = time.perf_counter()
+
+    def _end_statement(self, connection, cursor, statement, parameters,
+                       context, executemany):
+        # Parameters are left out, they can hold passwords hashes or tokens
+        if has_request_context() and '_profile' in g:
+            g._profile['sql'].append({
+                'statement': statement,
+                'seconds': (time.perf_counter()
+                            - connection.info['_profile_started'])})
+
+
+def _safe(name):
+    '''Return name with only the characters allowed in a capture id.'''
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+
+
+PROFILER = Profiler()
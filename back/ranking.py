@@ -0,0 +1,123 @@
+'''Lexicographic ranks used to order tasks and columns.
+
+A rank is a string over DIGITS compared with the database's plain string
+ordering. There is always room for a new rank between two others, so
+moving a row only rewrites the rank of that row. Ranks never end with the
+smallest digit, which is what keeps that room.
+
+Ranks get longer every time rows are squeezed in at the same spot, once one
+gets longer than MAX_RANK_LENGTH the rows it belongs to are given evenly
+spaced ranks again by a background rebalance.'''
+import threading
+from flask import current_app
+from sqlalchemy import func
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+MAX_RANK_LENGTH = 32
+
+
+def rank_between(before=None, after=None):
+    '''Return a rank sorting after the rank before and before the rank after,
+       either of them can be None to leave that side open.
+
+       Ranks squeezed between two others take the middle of the gap, ranks
+       added at either end take the closest free digit instead, so that
+       appending rows one after the other keeps ranks short.'''
+    appending = after is None
+    prepending = not before and not appending
+    before = before or ''
+
+    if after is not None and after <= before:
+        raise ValueError("'{}' does not sort before '{}'".format(before, after))
+
+    rank = ''
+    bounded = after is not None
+    index = 0
+
+    while True:
+        low = DIGITS.index(before[index]) if index < len(before) else 0
+        high = (DIGITS.index(after[index])
+                if bounded and index < len(after) else BASE)
+
+        if high - low > 1:
+            if appending:
+                return rank + DIGITS[low + 1]
+            if prepending:
+                return rank + DIGITS[high - 1]
+            return rank + DIGITS[(low + high) // 2]
+
+        rank += DIGITS[low]
+
+        if high > low:
+            bounded = False
+        index += 1
+
+
+def spread(count):
+    '''Return count increasing ranks, evenly spaced and as short as possible.'''
+    width = 1
+
+    while BASE ** width < 2 * (count + 1):
+        width += 1
+
+    step = BASE ** width // (count + 1)
+    return [_encode(step * index, width).rstrip(DIGITS[0])
+            for index in range(1, count + 1)]
+
+
+def sequence():
+    '''Yield increasing ranks, for rows whose number isn't known up front.
+       The first digit of a rank is the number of digits following it, the
+       ranks of a same length are evenly spaced, the first million ranks are
+       at most five digits long.'''
+    width = 1
+
+    while True:
+        # Odd values never end with the smallest digit
+        for value in range(1, BASE ** width, 2):
+            yield DIGITS[width] + _encode(value, width)
+        width += 1
+
+
+def _encode(value, width):
+    '''Return value written with width digits.'''
+    digits = []
+
+    for _ in range(width):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return ''.join(reversed(digits))
+
+
+def place(query, position, after=None, before=None):
+    '''Return the rank putting a row among the rows of query, right after
+       the rank after, right before the rank before, or last if neither is
+       given. position is the rank column of the rows, every lookup is a
+       single probe of the index on it.'''
+    if after is not None:
+        upper = (query.filter(position > after)
+                 .with_entities(func.min(position)).scalar())
+        return rank_between(after, upper)
+
+    if before is not None:
+        lower = (query.filter(position < before)
+                 .with_entities(func.max(position)).scalar())
+        return rank_between(lower, before)
+
+    last = query.with_entities(func.max(position)).scalar()
+    return rank_between(last, None)
+
+
+def rebalance_later(rank, function, *args):
+    '''Run function(*args) in a background thread if rank got too long.'''
+    if len(rank) <= MAX_RANK_LENGTH:
+        return
+
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            function(*args)
+
+    threading.Thread(target=run, daemon=True).start()
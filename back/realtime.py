@@ -0,0 +1,95 @@
+'''Push board changes to the users currently looking at the board.
+
+Every board has its own Socket.IO room. A client joins the room of a board
+with the 'join' event, which is only granted to the users the board is
+visible to, and then receives a 'board_changed' event for every successful
+change made to the board:
+
+    {'table_id': 1, 'version': 12, 'type': 'task_added', 'data': {...}}
+
+Sessions and rooms live in the memory of the process serving them, the
+clients of a board must all be served by the same process. serve.py only
+runs one worker while REALTIME_ENABLED is set.
+'''
+import socketio
+import flask_login
+from models.users import Users
+
+SOCKETIO = socketio.Server(async_mode='threading')
+_app = None
+
+
+def init_app(app):
+    '''Serve Socket.IO requests alongside the flask application, unless
+       REALTIME_ENABLED is off.'''
+    global _app
+    _app = app
+
+    if not app.config.get('REALTIME_ENABLED', True):
+        return
+    app.wsgi_app = socketio.WSGIApp(SOCKETIO, app.wsgi_app)
+
+
+def room_of(table):
+    '''Return the name of the table's room.'''
+    return 'table-{}'.format(table.id)
+
+
+def notify(table, change_type, data):
+    '''Send a change made to the table to the users looking at it.'''
+    SOCKETIO.emit('board_changed',
+                  {'table_id': table.id, 'version': table.version,
+                   'type': change_type, 'data': data},
+                  room=room_of(table))
+
+
+def evict(table, email):
+    '''Remove the user matching email from the table's room, used when the
+       user is no longer a member of the table.'''
+    room = room_of(table)
+
+    if room not in SOCKETIO.manager.rooms.get('/', {}):
+        return
+
+    for sid in list(SOCKETIO.manager.get_participants('/', room)):
+        if SOCKETIO.get_session(sid).get('email') == email:
+            SOCKETIO.leave_room(sid, room)
+
+
+@SOCKETIO.on('connect')
+def connect(sid, environ):
+    '''Only accept connections from logged in users.'''
+    with _app.request_context(environ):
+        user = flask_login.current_user
+
+        if not user.is_authenticated:
+            return False
+        SOCKETIO.save_session(sid, {'email': user.get_id()})
+
+
+@SOCKETIO.on('join')
+def join(sid, data):
+    '''Join the room of the table named in data, leaving the previous one.'''
+    email = SOCKETIO.get_session(sid).get('email')
+    name = data.get('table') if isinstance(data, dict) else None
+
+    with _app.app_context():
+        user = Users.query.get(email)
+        table, status = user.get_table_by_name(name) if user else (None, None)
+
+        if not table:
+            return {'error': True, 'message': status}
+
+        for room in SOCKETIO.rooms(sid):
+            if room.startswith('table-'):
+                SOCKETIO.leave_room(sid, room)
+        SOCKETIO.enter_room(sid, room_of(table))
+        return {'error': False, 'table_id': table.id}
+
+
+@SOCKETIO.on('leave')
+def leave(sid, data=None):
+    '''Leave the room of the current table.'''
+    for room in SOCKETIO.rooms(sid):
+        if room.startswith('table-'):
+            SOCKETIO.leave_room(sid, room)
@@ -0,0 +1,120 @@
+'''Full-text search over the tasks.
+
+tasks_fts is an SQLite FTS5 index holding, for every task, its description
+along with the names of its column and table. Triggers on the tasks,
+columns and tables keep it in sync whatever the statement changing them,
+the ORM's unit of work as well as the bulk updates and deletes.
+
+The id of the task's table is also indexed, as a 'b<id>' token in the board
+column, so that restricting a search to the user's tables is part of the
+full-text match instead of a lookup of every matching row.
+
+The index is not one of the models, DATABASE.create_all() leaves it alone,
+install() creates it. Only SQLite databases have one, see available().'''
+import re
+from sqlalchemy import column, table
+
+TASKS_FTS = table('tasks_fts', column('rowid'), column('description'),
+                  column('column_name'), column('table_name'),
+                  column('board'), column('column_id'), column('table_id'),
+                  column('rank'))
+
+MAX_TERMS = 16
+
+_CREATE_INDEX = '''
+CREATE VIRTUAL TABLE tasks_fts USING fts5(
+    description, column_name, table_name, board,
+    column_id UNINDEXED, table_id UNINDEXED,
+    prefix = '2 3',
+    tokenize = 'unicode61 remove_diacritics 2'
+)'''
+
+_INDEX_TASKS = '''
+INSERT INTO tasks_fts (rowid, description, column_name, table_name, board,
+                       column_id, table_id)
+SELECT tasks.id, tasks.description, columns.name, tables.name,
+       'b' || tables.id, columns.id, tables.id
+FROM tasks
+JOIN columns ON columns.id = tasks.column_id
+JOIN tables ON tables.id = columns.table_id'''
+
+_TRIGGERS = [
+    '''
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+''' + _INDEX_TASKS + '''
+    WHERE tasks.id = new.id;
+END''',
+    '''
+CREATE TRIGGER IF NOT EXISTS tasks_fts_update
+AFTER UPDATE OF description, column_id ON tasks BEGIN
+    DELETE FROM tasks_fts WHERE rowid = old.id;
+''' + _INDEX_TASKS + '''
+    WHERE tasks.id = new.id;
+END''',
+    '''
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    DELETE FROM tasks_fts WHERE rowid = old.id;
+END''',
+    '''
+CREATE TRIGGER IF NOT EXISTS columns_fts_update
+AFTER UPDATE OF name ON columns BEGIN
+    UPDATE tasks_fts SET column_name = new.name
+    WHERE rowid IN (SELECT id FROM tasks WHERE column_id = new.id);
+END''',
+    '''
+CREATE TRIGGER IF NOT EXISTS tables_fts_update
+AFTER UPDATE OF name ON tables BEGIN
+    UPDATE tasks_fts SET table_name = new.name
+    WHERE rowid IN (SELECT tasks.id FROM tasks
+                    JOIN columns ON columns.id = tasks.column_id
+                    WHERE columns.table_id = new.id);
+END''',
+]
+
+
+def available(bind):
+    '''Return True if the database of the engine or connection given has
+       the search index, only SQLite has FTS5.'''
+    return bind.dialect.name == 'sqlite'
+
+
+def install(connection):
+    '''Create the search index and the triggers keeping it in sync, indexing
+       the tasks already there. Nothing is done if they already exist, or if
+       the database can't have them.'''
+    if not available(connection):
+        return
+
+    exists = connection.execute("SELECT 1 FROM sqlite_master "
+                                "WHERE name = 'tasks_fts'").scalar()
+
+    if not exists:
+        connection.execute(_CREATE_INDEX)
+        connection.execute(_INDEX_TASKS)
+
+    for trigger in _TRIGGERS:
+        connection.execute(trigger)
+
+
+def index_table(connection, table_id):
+    '''Index the tasks of the table matching id. The triggers only see the
+       tasks inserted into a column already attached to its table, the
+       tasks of the columns attached afterwards are indexed this way.'''
+    if available(connection):
+        connection.execute(_INDEX_TASKS + '\nWHERE tables.id = ?', table_id)
+
+
+def search_terms(text):
+    '''Return the words of what the user typed, at most MAX_TERMS of them.'''
+    return re.findall(r'\w+', text or '')[:MAX_TERMS]
+
+
+def match_query(words, table_ids):
+    '''Return the FTS5 query matching the tasks of the tables whose ids are
+       given that contain every word, the last one being possibly
+       unfinished.'''
+    terms = ['"{}"'.format(word) for word in words]
+    terms[-1] += '*'
+    boards = ' OR '.join('"b{:d}"'.format(id) for id in table_ids)
+    return '{{description column_name table_name}} : ({}) AND board : ({})' \
+        .format(' '.join(terms), boards)
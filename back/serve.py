@@ -0,0 +1,443 @@
+'''Production server: several worker processes sharing one listening socket.
+
+    cd back && TRELLO_CONFIG=production SECRET_KEY_FILE=/etc/trello/key \\
+        python serve.py --bind 0.0.0.0:8000 --workers 4 --threads 16
+
+The master process binds the socket and forks the workers, it never loads
+the application itself. Each worker imports it after the fork and serves
+requests from the shared socket on a pool of threads, at most --threads of
+them at a time.
+
+Signals sent to the master:
+    SIGHUP          graceful restart, a new set of workers is started with
+                    the current code and configuration, one at a time, the
+                    old ones stop once their replacement is ready
+    SIGTERM/SIGINT  graceful shutdown, workers finish their requests first
+
+Workers write a heartbeat every few seconds, a worker silent for longer than
+--timeout is killed and replaced, as is any worker that exits. GET /healthz
+answers with the state of the worker handling it and of all the others.
+
+Every worker has its own board cache. Socket.IO sessions and rooms live in
+a single process, a client's requests can't be routed to the worker holding
+its session: while REALTIME_ENABLED is set only one worker is run, more
+workers need it turned off in the settings.'''
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+HEARTBEAT_SECONDS = 2
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--bind', default=os.environ.get('BIND', '127.0.0.1:8000'),
+                        help='host:port to listen on')
+    parser.add_argument('--workers', type=int,
+                        default=(int(os.environ['WEB_CONCURRENCY'])
+                                 if os.environ.get('WEB_CONCURRENCY')
+                                 else None),
+                        help='worker processes, one per CPU by default, a '
+                             'single one while realtime is enabled')
+    parser.add_argument('--threads', type=int, default=16,
+                        help='requests served at once by each worker')
+    parser.add_argument('--timeout', type=int, default=30,
+                        help='seconds without heartbeat before a worker is '
+                             'replaced')
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help='seconds given to a worker to finish its requests')
+    return parser.parse_args(argv)
+
+
+# ##########################- Worker -########################################
+
+class WorkerApp:
+    '''WSGI middleware counting the worker's requests, bounding how many run
+       at once and answering /healthz.'''
+
+    def __init__(self, app, state, threads):
+        self.app = app
+        self.state = state
+        self._slots = threading.BoundedSemaphore(threads)
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+
+        if path == '/healthz':
+            return self.health(start_response)
+
+        # Socket.IO long polls wait for events, they don't take a slot
+        if path.startswith('/socket.io'):
+            return self.app(environ, start_response)
+
+        self._slots.acquire()
+
+        with self._lock:
+            self.state['active'] += 1
+            self.state['requests'] += 1
+
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            self.release()
+            raise
+
+        # Streamed to the client, the slot is held until the server closes
+        # the response
+        return Response(result, self.release)
+
+    def release(self):
+        with self._lock:
+            self.state['active'] -= 1
+        self._slots.release()
+
+    def health(self, start_response):
+        workers = read_heartbeats(self.state['health_dir'])
+        now = time.time()
+
+        for worker in workers:
+            worker['healthy'] = now - worker['heartbeat'] < self.state['timeout']
+        body = json.dumps({'worker': snapshot(self.state),
+                           'workers': workers}).encode('utf-8')
+        healthy = all(worker['healthy'] for worker in workers)
+        start_response('200 OK' if healthy else '503 Service Unavailable',
+                       [('Content-Type', 'application/json'),
+                        ('Content-Length', str(len(body))),
+                        ('Cache-Control', 'no-store')])
+        return [body]
+
+
+class Response:
+    '''Iterates over the body of a response, calling release once it is
+       closed.'''
+
+    def __init__(self, result, release):
+        self.result = result
+        self.release = release
+
+    def __iter__(self):
+        return iter(self.result)
+
+    def close(self):
+        try:
+            if hasattr(self.result, 'close'):
+                self.result.close()
+        finally:
+            self.release()
+
+
+def snapshot(state):
+    '''Return what a worker reports about itself.'''
+    return {'pid': os.getpid(),
+            'generation': state['generation'],
+            'started': state['started'],
+            'heartbeat': time.time(),
+            'requests': state['requests'],
+            'active': state['active'],
+            'ready': state['ready'],
+            'stopping': state['stopping']}
+
+
+def write_heartbeat(state):
+    path = os.path.join(state['health_dir'], '{}.json'.format(os.getpid()))
+
+    with open(path + '.tmp', 'w') as heartbeat:
+        json.dump(snapshot(state), heartbeat)
+    os.replace(path + '.tmp', path)
+
+
+def read_heartbeats(health_dir):
+    '''Return the last heartbeat of every worker.'''
+    workers = []
+
+    for filename in sorted(os.listdir(health_dir)):
+        if filename.endswith('.json'):
+            try:
+                with open(os.path.join(health_dir, filename)) as heartbeat:
+                    workers.append(json.load(heartbeat))
+            except (OSError, ValueError):
+                continue
+    return workers
+
+
+def run_worker(listener, options, generation, health_dir):
+    '''Serve requests from the listener until told to stop.'''
+    from werkzeug.serving import make_server
+
+    state = {'generation': generation, 'started': time.time(), 'requests': 0,
+             'active': 0, 'ready': False, 'stopping': False,
+             'health_dir': health_dir, 'timeout': options.timeout}
+    write_heartbeat(state)
+
+    # Loaded after the fork, a restart picks up the current code
+    import server
+
+    host, port = listener.getsockname()[:2]
+    wsgi = WorkerApp(server.app, state, options.threads)
+    httpd = make_server(host, port, wsgi, threaded=True,
+                        fd=listener.fileno())
+    stopped = threading.Event()
+
+    def stop(signum, frame):
+        state['stopping'] = True
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    def beat():
+        while not stopped.wait(HEARTBEAT_SECONDS):
+            write_heartbeat(state)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    threading.Thread(target=beat, daemon=True).start()
+    state['ready'] = True
+    write_heartbeat(state)
+    httpd.serve_forever()
+
+    deadline = time.monotonic() + options.graceful_timeout
+
+    while state['active'] and time.monotonic() < deadline:
+        time.sleep(0.1)
+    stopped.set()
+
+
+# ##########################- Master -########################################
+
+class Master:
+    '''Keeps the configured number of workers of the current generation
+       running.'''
+
+    def __init__(self, options):
+        self.options = options
+        self.health_dir = tempfile.mkdtemp(prefix='trello-workers-')
+        self.generation = 0
+        self.workers = {}
+        self.reloading = False
+        self.stopping = False
+
+    def listen(self):
+        host, port = self.options.bind.rsplit(':', 1)
+        listener = socket.socket(socket.AF_INET6 if ':' in host
+                                 else socket.AF_INET)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host.strip('[]'), int(port)))
+        listener.listen(1024)
+        listener.set_inheritable(True)
+        return listener
+
+    def spawn(self, listener):
+        pid = os.fork()
+
+        if pid == 0:
+            code = 0
+
+            try:
+                run_worker(listener, self.options, self.generation,
+                           self.health_dir)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+
+        self.workers[pid] = {'generation': self.generation,
+                             'started': time.time()}
+        return pid
+
+    def heartbeat(self, pid):
+        path = os.path.join(self.health_dir, '{}.json'.format(pid))
+
+        try:
+            with open(path) as heartbeat:
+                return json.load(heartbeat)
+        except (OSError, ValueError):
+            return None
+
+    def wait_ready(self, pid):
+        '''Wait until the worker serves requests, return False if it died or
+           took too long.'''
+        deadline = time.monotonic() + self.options.timeout
+
+        while time.monotonic() < deadline:
+            self.reap()
+
+            if pid not in self.workers:
+                return False
+
+            heartbeat = self.heartbeat(pid)
+
+            if heartbeat and heartbeat['ready']:
+                return True
+            time.sleep(0.1)
+        return False
+
+    def reap(self):
+        '''Forget the workers that exited.'''
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+
+            if pid == 0:
+                return
+
+            worker = self.workers.pop(pid, None)
+
+            # Workers of older generations are expected to exit
+            if (worker and worker['generation'] == self.generation
+                    and not self.stopping):
+                log("worker {} exited with status {}".format(
+                    pid, os.waitstatus_to_exitcode(status)))
+
+            try:
+                os.remove(os.path.join(self.health_dir, '{}.json'.format(pid)))
+            except FileNotFoundError:
+                pass
+
+    def kill_hung(self):
+        now = time.time()
+
+        for pid, worker in list(self.workers.items()):
+            heartbeat = self.heartbeat(pid)
+            last = heartbeat['heartbeat'] if heartbeat else worker['started']
+
+            if now - last > self.options.timeout:
+                log("worker {} stopped answering, killing it".format(pid))
+                _signal(pid, signal.SIGKILL)
+
+    def current(self):
+        return [pid for pid, worker in self.workers.items()
+                if worker['generation'] == self.generation]
+
+    def run(self):
+        listener = self.listen()
+        log("listening on {} with {} workers".format(self.options.bind,
+                                                     self.options.workers))
+        signal.signal(signal.SIGHUP, self.on_reload)
+        signal.signal(signal.SIGTERM, self.on_stop)
+        signal.signal(signal.SIGINT, self.on_stop)
+
+        while not self.stopping:
+            if self.reloading:
+                self.reloading = False
+                self.reload(listener)
+
+            self.reap()
+            self.kill_hung()
+
+            # Started one at a time, the first one creates the database
+            if len(self.current()) < self.options.workers:
+                if not self.wait_ready(self.spawn(listener)):
+                    time.sleep(1)
+                continue
+            time.sleep(0.5)
+
+        self.shutdown()
+
+    def reload(self, listener):
+        '''Replace every worker by one of a new generation.'''
+        old = list(self.workers)
+        self.generation += 1
+        log("restarting workers, generation {}".format(self.generation))
+
+        for pid in old:
+            if self.stopping:
+                return
+
+            if self.wait_ready(self.spawn(listener)):
+                _signal(pid, signal.SIGTERM)
+            else:
+                log("new worker failed to start, keeping worker {}"
+                    .format(pid))
+
+    def shutdown(self):
+        log("shutting down")
+
+        for pid in self.workers:
+            _signal(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self.options.graceful_timeout + 1
+
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+
+        for pid in self.workers:
+            _signal(pid, signal.SIGKILL)
+        shutil.rmtree(self.health_dir, ignore_errors=True)
+
+    def on_reload(self, signum, frame):
+        self.reloading = True
+
+    def on_stop(self, signum, frame):
+        self.stopping = True
+
+
+def _signal(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def log(message):
+    print('[serve {}] {}'.format(os.getpid(), message), file=sys.stderr,
+          flush=True)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    app = load_config()
+    options.workers = worker_count(options.workers, app)
+    shared_secret_key(app)
+    Master(options).run()
+
+
+def load_config():
+    '''Return a bare application holding the configuration the workers will
+       load.'''
+    import config
+    from flask import Flask
+
+    app = Flask(__name__)
+
+    try:
+        config.load(app)
+    except (RuntimeError, ValueError, OSError) as error:
+        sys.exit(str(error))
+    return app
+
+
+def worker_count(workers, app):
+    '''Return the number of workers to run, workers being the number asked
+       for if any. Realtime clients must all reach the same worker.'''
+    if not app.config.get('REALTIME_ENABLED', True):
+        return workers or os.cpu_count() or 1
+    if workers is not None and workers > 1:
+        sys.exit("Realtime updates need a single worker, set REALTIME_ENABLED "
+                 "= False in the settings to run {} of them".format(workers))
+    return 1
+
+
+def shared_secret_key(app):
+    '''Make sure every worker signs sessions with the same key. A key made
+       up by the configuration is handed to the workers through the
+       environment, it lasts as long as the master.'''
+    if not (os.environ.get('SECRET_KEY') or os.environ.get('SECRET_KEY_FILE')
+            or app.config.get('SECRET_KEY_FILE')):
+        os.environ['SECRET_KEY'] = app.config['SECRET_KEY']
+        log("no SECRET_KEY given, sessions won't survive a restart")
+
+
+if __name__ == '__main__':
+    main()
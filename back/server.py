@@ -1,44 +1,291 @@
 import secrets
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+import click
+from flask import Flask, Response, render_template, request, redirect, url_for, stream_with_context
 import flask_login
-from database import DATABASE
+import config
+import migrations
+import realtime
+import search
+from board_cache import BOARD_CACHE, with_role
+from board_io import BoardFormatError, export_board, import_board
+from change_log import CHANGE_LOG
+from compression import COMPRESSOR
+from hashing import PASSWORD_HASHER
+from json_encoding import JSON_ENCODER, jsonify
+from metrics import METRICS
+from profiling import PROFILER, sign
+from user_cache import USER_CACHE
+from pagination import (encode_cursor, decode_cursor, page_size,
+                        MIN_INTEGER, MAX_INTEGER)
+from database import DATABASE, init_database
 from forms_validation import validate_signup, validate_name, validate_email
-from models.users import Users, add_user, retrieve_user
-from models.tables import Tables
+from models.users import Users, add_user, get_user, retrieve_user
+from models.tables import Tables, load_board, get_board_state
 from models.columns import Columns
 from models.tasks import Tasks
 from models.members import Members
+from models.roles import Role
 
 
 # #################-Application setup-#########################################
 
-def create_app():
+def create_app(profile=None):
     app = Flask(__name__)
-    app.config['SECRET_KEY'] = secrets.token_urlsafe(64)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///.database/trello.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    config.load(app, profile)
 
-    DATABASE.app = app
-    DATABASE.init_app(app)
+    init_database(app)
+    JSON_ENCODER.init_app(app)
     login_manager.init_app(app)
+    BOARD_CACHE.init_app(app)
+    PASSWORD_HASHER.init_app(app)
+    USER_CACHE.init_app(app)
+    CHANGE_LOG.init_app(app)
+    METRICS.init_app(app, DATABASE.get_engine(app))
+    METRICS.register_stats('board_cache', BOARD_CACHE.stats)
+    METRICS.register_stats('user_cache', USER_CACHE.stats)
+    METRICS.register_stats('password_hasher', PASSWORD_HASHER.stats)
+    METRICS.register_stats('change_log', CHANGE_LOG.stats)
+    PROFILER.init_app(app, DATABASE.get_engine(app))
+    METRICS.register_stats('profiler', PROFILER.stats)
+    # Registered last so that its compressed bodies are the ones measured
+    COMPRESSOR.init_app(app)
+    realtime.init_app(app)
 
     with app.test_request_context():
+        is_new_database = not DATABASE.engine.has_table('tables')
         DATABASE.create_all()
+
+        if is_new_database:
+            with DATABASE.engine.begin() as connection:
+                search.install(connection)
+            migrations.stamp(DATABASE.engine)
+        elif migrations.get_version(DATABASE.engine) < migrations.LATEST_VERSION:
+            app.logger.warning("The database schema is out of date, "
+                               "run 'flask upgrade-db' to migrate it")
     return app
 
 
+MAX_BULK_OPERATIONS = 1000
+
 login_manager = flask_login.LoginManager()
 login_manager.login_view = 'login'
 app = create_app()
 
 
+@app.cli.command('upgrade-db')
+def upgrade_db():
+    '''Migrate an existing database to the current schema.'''
+    applied = migrations.upgrade(DATABASE.engine)
+
+    for version, description in applied:
+        print("Applied migration {}: {}".format(version, description))
+    print("Database schema is at version {}".format(
+        migrations.get_version(DATABASE.engine)))
+
+
+@app.cli.command('profiles')
+def list_profiles():
+    '''List the captured request profiles, the most recent first.'''
+    for capture in PROFILER.captures():
+        print("{id}  {status} {method} {path}  {seconds:.3f}s  "
+              "{queries} queries".format(queries=len(capture['sql']),
+                                         **capture))
+
+
+@app.cli.command('show-profile')
+@click.argument('capture_id')
+@click.option('--sort', default='cumulative', help='pstats sort key')
+@click.option('--limit', default=30, help='number of functions shown')
+def show_profile(capture_id, sort, limit):
+    '''Print the statistics and the SQL statements of a capture.'''
+    print(PROFILER.report(capture_id, sort, limit))
+
+
+@app.cli.command('profile-link')
+@click.argument('path')
+def profile_link(path):
+    '''Print the link profiling a request to path.'''
+    if not PROFILER.token:
+        raise click.ClickException("PROFILING_TOKEN is not set")
+    print("{}?profile={}".format(path, sign(PROFILER.token, path)))
+
+
+@app.cli.command('export-board')
+@click.argument('name')
+@click.option('--output', type=click.File('wb'), default='-',
+              help='file written, standard output by default')
+def export_board_command(name, output):
+    '''Write the table matching name as newline-delimited JSON.'''
+    table = Tables.query.filter_by(name=name).first()
+
+    if table is None:
+        raise click.ClickException("Table '{}' not found".format(name))
+
+    for chunk in export_board(table.id):
+        output.write(chunk)
+
+
+@app.cli.command('import-board')
+@click.argument('source', type=click.File('rb'))
+@click.option('--owner', required=True, help='email of the new creator')
+@click.option('--name', default=None, help='name of the new table')
+def import_board_command(source, owner, name):
+    '''Create a table from an export made by export-board.'''
+    if Users.query.get(owner) is None:
+        raise click.ClickException("User '{}' not found".format(owner))
+
+    try:
+        table_name, counts = import_board(source, owner, name)
+    except BoardFormatError as error:
+        raise click.ClickException(str(error))
+    print("Imported table '{}': {columns} columns, {tasks} tasks, "
+          "{members} members, {skipped_members} members without an account "
+          "left out".format(table_name, **counts))
+
+
 @login_manager.user_loader
 def load_user(email):
     if email is not None:
-        return Users.query.get(email)
+        return get_user(email)
     return None
 
 
+def wants_delta():
+    '''Return True if the client asked mutation routes to answer with the
+       change only, through the 'X-Board-Response: delta' header or the
+       'response=delta' query parameter.'''
+    return 'delta' in (request.headers.get('X-Board-Response'),
+                       request.args.get('response'))
+
+
+def board_representation():
+    '''Return 'compact' if the client asked for boards in the representation
+       of Tables.to_compact_dict, through the 'X-Board-Format: compact'
+       header or the 'format=compact' query parameter, 'full' otherwise.'''
+    if 'compact' in (request.headers.get('X-Board-Format'),
+                     request.args.get('format')):
+        return 'compact'
+    return 'full'
+
+
+def board_changed(table, change_type, data):
+    '''Tell the board's viewers about a successful change and answer the
+       request, with the whole board or only the change and the new version
+       of the board if the client asked for it.'''
+    realtime.notify(table, change_type, data)
+
+    if wants_delta():
+        return jsonify({'error': False,
+                        'version': table.version,
+                        'type': change_type,
+                        'data': data})
+    return board_response(load_board(table.id))
+
+
+def board_response(table):
+    '''Answer with the serialized board, caching it for the next viewers.'''
+    representation = board_representation()
+    body, role = serialize_board(table, representation)
+    return cached_board_response(body, table.id, table.version, role,
+                                 representation)
+
+
+def serialize_board(table, representation):
+    '''Return the board in the representation asked for, without the user's
+       role, caching it for the next viewers, and the user's role.'''
+    if representation == 'compact':
+        board = table.to_compact_dict(flask_login.current_user.get_id())
+    else:
+        board = table.to_dict(flask_login.current_user.get_id())
+    role = board.pop('current_user_role')
+    body = BOARD_CACHE.put(table.id, table.version, JSON_ENCODER.dumps(board),
+                           representation)
+    return (body, role)
+
+
+def board_with_role(table):
+    '''Return the serialized board with the user's role, from the cache when
+       it holds the current version.'''
+    representation = board_representation()
+    table_id, version, role = get_board_state(
+        table.name, flask_login.current_user.get_id())
+    body = BOARD_CACHE.get(table_id, version, representation)
+
+    if body is None:
+        body, role = serialize_board(load_board(table_id), representation)
+    return with_role(body, role)
+
+
+def cached_board_response(body, table_id, version, role, representation):
+    '''Answer with a serialized board, adding the user's role to it.'''
+    response = Response(with_role(body, role), mimetype='application/json')
+    response.set_etag(board_etag(table_id, version, role,
+                                 *representation_variant(representation)))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('X-Board-Format')
+    return response
+
+
+def board_etag(table_id, version, role, *variant):
+    '''Return the ETag of a board as seen by a user with the role, variant
+       tells apart the other representations of the board.'''
+    return '-'.join(str(part) for part in (table_id, version, role) + variant)
+
+
+def representation_variant(representation):
+    '''Return the ETag variant of the representation of a board, none for
+       the full one.'''
+    return () if representation == 'full' else (representation,)
+
+
+def not_modified(etag):
+    '''Answer a conditional request whose ETag still matches.'''
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional(response):
+    '''Tag a listing with the hash of its body and answer 304 Not Modified
+       when the client already has it.'''
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def requested_page():
+    '''Return the sort key and the page size asked for through the 'after'
+       and 'limit' query parameters, (None, None) when the client wants the
+       whole listing.'''
+    if 'after' not in request.args and 'limit' not in request.args:
+        return (None, None)
+    return (decode_cursor(request.args.get('after'), int),
+            page_size(request.args.get('limit', type=int)))
+
+
+def is_optional_id(value):
+    '''Return True if the value sent is missing or can be the id of a row,
+       an int that isn't a boolean and fits in the database's integers.'''
+    return value is None or (type(value) is int
+                             and MIN_INTEGER <= value <= MAX_INTEGER)
+
+
+def table_names(key, tables, limit):
+    '''Return the names of the tables under key, along with the cursor of
+       the next page when the listing is paginated. The tables should hold
+       one more table than the page when there is a next page.'''
+    if limit is None:
+        return {key: [t.name for t in tables]}
+
+    next_cursor = None
+
+    if len(tables) > limit:
+        tables = tables[:limit]
+        next_cursor = encode_cursor(tables[-1].id)
+    return {key: [t.name for t in tables], 'next_cursor': next_cursor}
+
+
 # ############################- Basic Routes -################################
 @app.route('/')
 def index():
@@ -111,6 +358,17 @@ def logout():
     return redirect(url_for('index'))
 
 
+@app.route('/metrics')
+def metrics():
+    token = app.config.get('METRICS_TOKEN')
+
+    if token and not secrets.compare_digest(
+            request.headers.get('Authorization', ''), 'Bearer ' + token):
+        return Response(status=401)
+    return Response(METRICS.render(),
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ##################- Route to retrieve current user info -####################
 @app.route('/users/get-current-user/')
 @flask_login.login_required
@@ -124,10 +382,11 @@ def get_current_user():
 @flask_login.login_required
 def view_private_tables():
     current_user = flask_login.current_user
-    tables, status = current_user.get_private_tables()
+    after, limit = requested_page()
+    tables, status = current_user.get_private_tables(after, limit and limit + 1)
 
     if tables:
-        return jsonify({'private_tables': [t.name for t in tables]})
+        return conditional(jsonify(table_names('private_tables', tables, limit)))
     return jsonify({'error': True,
                     'message': status,
                     'clear': True}
@@ -138,10 +397,11 @@ def view_private_tables():
 @flask_login.login_required
 def view_tables_shared_with_others():
     current_user = flask_login.current_user
-    tables, status = current_user.get_tables_shared_with_others()
+    after, limit = requested_page()
+    tables, status = current_user.get_tables_shared_with_others(after, limit and limit + 1)
 
     if tables:
-        return jsonify({'tables_shared_with_others': [t.name for t in tables]})
+        return conditional(jsonify(table_names('tables_shared_with_others', tables, limit)))
     return jsonify({'error': True,
                     'message': status,
                     'clear': True})
@@ -151,36 +411,150 @@ def view_tables_shared_with_others():
 @flask_login.login_required
 def view_tables_shared_with_me():
     current_user = flask_login.current_user
-    tables, status = current_user.get_tables_shared_with_me()
+    after, limit = requested_page()
+    tables, status = current_user.get_tables_shared_with_me(after, limit and limit + 1)
 
     if tables:
-        return jsonify({'tables_shared_with_me': [t.name for t in tables]})
+        return conditional(jsonify(table_names('tables_shared_with_me', tables, limit)))
     return jsonify({'error': True,
                     'message': status,
                     'clear': True}
                    )
 
 
+@app.route('/tables/dashboard/')
+@flask_login.login_required
+def view_dashboard():
+    current_user = flask_login.current_user
+    return conditional(jsonify(current_user.get_dashboard()))
+
+
+@app.route('/tables/search/')
+@flask_login.login_required
+def search_tasks():
+    words = search.search_terms(request.args.get('q'))
+
+    if not words:
+        return jsonify({'error': True,
+                        'message': "You did not give anything to search for",
+                        'clear': False})
+    if not search.available(DATABASE.engine):
+        return jsonify({'error': True,
+                        'message': "Search is not available on this server",
+                        'clear': False})
+
+    tasks, next_cursor = flask_login.current_user.search_tasks(
+        words,
+        decode_cursor(request.args.get('after'), (int, float), int),
+        page_size(request.args.get('limit', type=int)))
+    return jsonify({'tasks': tasks, 'next_cursor': next_cursor})
+
+
 @app.route('/tables/<string:name>')
 @flask_login.login_required
 def view_table(name):
     current_user = flask_login.current_user
     
     if name:
-        table, status = current_user.get_table_by_name(name)
+        state = get_board_state(name, current_user.get_id())
 
-        if not table:
+        if not state:
             return jsonify({'error': True,
-                            'message': status,
+                            'message': "Table '{}' not found".format(name),
                             'clear': True}
                            )
-        return jsonify(table.to_dict(current_user.get_id()))
+        table_id, version, role = state
+
+        if request.args.get('skeleton'):
+            return view_table_skeleton(table_id, version, role)
+
+        representation = board_representation()
+        etag = board_etag(table_id, version, role,
+                          *representation_variant(representation))
+
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+
+        body = BOARD_CACHE.get(table_id, version, representation)
+
+        if body is not None:
+            return cached_board_response(body, table_id, version, role,
+                                         representation)
+        return board_response(load_board(table_id))
     return jsonify({'error': True,
                             'message': "You did not provide a name for the table you wish to view",
                             'clear': True}
                            )
 
 
+def view_table_skeleton(table_id, version, role):
+    '''Answer with the board's columns, their task counts and only the first
+       page of their tasks, the rest being fetched through view_tasks.'''
+    size = page_size(request.args.get('limit', type=int))
+    variant = ('skeleton', size) + representation_variant(board_representation())
+    etag = board_etag(table_id, version, role, *variant)
+
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+
+    table = load_board(table_id, with_tasks=False)
+    response = jsonify(table.to_skeleton_dict(
+        flask_login.current_user.get_id(), size,
+        compact=board_representation() == 'compact'))
+    response.set_etag(board_etag(table.id, table.version, role, *variant))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('X-Board-Format')
+    return response
+
+
+@app.route('/tables/<int:table_id>/changes')
+@flask_login.login_required
+def view_changes(table_id):
+    '''Answer with the changes made to the table since the version given in
+       the 'since' query parameter, in order, or with 'resync' when they are
+       no longer all logged and the board has to be reloaded.'''
+    since = request.args.get('since', type=int)
+
+    if since is None:
+        return jsonify({'error': True,
+                        'message': "You did not provide the version you have",
+                        'clear': False})
+
+    table = Tables.query.get(table_id)
+
+    if table is None or \
+            table.get_role(flask_login.current_user.get_id()) is Role.NONE:
+        return jsonify({'error': True,
+                        'message': "Table not found",
+                        'clear': True})
+
+    changes, resync = CHANGE_LOG.changes_since(table, since)
+    return jsonify({'error': False,
+                    'version': table.version,
+                    'resync': resync,
+                    'changes': [change.to_dict() for change in changes]})
+
+
+@app.route('/tables/<string:t_name>/columns/<int:col_id>/tasks/')
+@flask_login.login_required
+def view_tasks(t_name, col_id):
+    current_user = flask_login.current_user
+    table, status = current_user.get_table_by_name(t_name)
+
+    if table:
+        column, status = table.get_column_by_id(col_id)
+
+        if column:
+            tasks, next_cursor = column.get_tasks_page(
+                decode_cursor(request.args.get('after'), str, int),
+                page_size(request.args.get('limit', type=int)))
+            return jsonify({'tasks': [task.to_dict() for task in tasks],
+                            'next_cursor': next_cursor})
+    return jsonify({'error': True,
+                    'message': status,
+                    'clear': False})
+
+
 @app.route('/tables/private-tables/<string:name>/share/')
 @flask_login.login_required
 def share_table(name):
@@ -220,6 +594,54 @@ def add_table():
                     "clear": False})
 
 
+@app.route('/tables/<string:name>/export')
+@flask_login.login_required
+def export_table(name):
+    '''Stream the table as newline-delimited JSON, see board_io.py.'''
+    state = get_board_state(name, flask_login.current_user.get_id())
+
+    if not state:
+        return jsonify({'error': True,
+                        'message': "Table '{}' not found".format(name),
+                        'clear': True})
+
+    response = Response(stream_with_context(export_board(state[0])),
+                        mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = (
+        'attachment; filename="{}.ndjson"'.format(name))
+    return response
+
+
+@app.route('/tables/import', methods=['POST'])
+@flask_login.login_required
+def import_table():
+    '''Create a table owned by the user from the export sent as the body,
+       named after the 'name' query parameter or the exported table.'''
+    name = request.args.get('name')
+
+    if name:
+        is_name_valid, status = validate_name(name)
+
+        if not is_name_valid:
+            return jsonify({'error': True,
+                            'message': status,
+                            'clear': False})
+
+    try:
+        table_name, counts = import_board(request.stream,
+                                          flask_login.current_user.get_id(),
+                                          name)
+    except BoardFormatError as error:
+        return jsonify({'error': True,
+                        'message': str(error),
+                        'clear': False})
+    return jsonify({'error': False,
+                    'message': "Table '{}' imported".format(table_name),
+                    'clear': True,
+                    'table_name': table_name,
+                    'counts': counts})
+
+
 @app.route('/tables/private-tables/delete-table/<string:name>')
 @flask_login.login_required
 def delete_private_table(name):
@@ -272,7 +694,7 @@ def rename_table(current_name):
             tab, status = table.rename(new_name)
 
             if tab:
-                return jsonify(tab.to_dict(current_user.get_id()))
+                return board_changed(tab, 'table_renamed', {'name': tab.name})
         return jsonify({"error": True,
                         "message": status,
                         "clear": False})
@@ -302,7 +724,7 @@ def add_column(table_name):
             col, status = table.add_column(column_name, current_user.get_id())
 
             if col:
-                return jsonify(table.to_dict(current_user.get_id()))
+                return board_changed(table, 'column_added', col.to_dict())
             return jsonify({"error": True,
                             "message": status,
                             "clear": False})
@@ -325,7 +747,7 @@ def delete_column_(table_name, name):
                                                       current_user.get_id())
 
         if status:
-            return jsonify(table.to_dict(current_user.get_id()))
+            return board_changed(table, 'column_deleted', {'name': name})
         return jsonify({"error": True,
                         "message": message,
                         "clear": False})
@@ -334,6 +756,32 @@ def delete_column_(table_name, name):
                     "clear": False})
 
 
+@app.route('/tables/<string:t_name>/columns/<int:col_id>/move/',
+           methods=['POST', ])
+@flask_login.login_required
+def move_column(t_name, col_id):
+    current_user = flask_login.current_user
+    table, status = current_user.get_table_by_name(t_name)
+
+    if table:
+        if not isinstance(request.json, dict) \
+                or not is_optional_id(request.json.get('after')) \
+                or not is_optional_id(request.json.get('before')):
+            return jsonify({"error": True,
+                            "message": "Something is off with what you submitted",
+                            "clear": False})
+        column, status = table.move_column(col_id, current_user.get_id(),
+                                           after_id=request.json.get('after'),
+                                           before_id=request.json.get('before'))
+
+        if column:
+            return board_changed(table, 'column_moved',
+                                 {'id': column.id, 'position': column.position})
+    return jsonify({"error": True,
+                    "message": status,
+                    "clear": False})
+
+
 # ###################- Routes for tasks manipulation-#########################
 @app.route('/tables/<string:t_name>/columns/<string:col_name>/add-task/',
            methods=['POST'])
@@ -350,21 +798,15 @@ def add_task(t_name, col_name):
             if column:
                 description = request.json.get('description')
 
-                if not table.shared:
+                if table.get_role(current_user.get_id()).can_edit():
                     task, status = column.add_task(description)
                 else:
-                    member = table.get_member_by_email(current_user.get_id())
-
-                    if member.get_member_role() in ("creator", "admin",
-                                                    "editor"):
-                        task, status = column.add_task(description)
-                    else:
-                        return jsonify({"error": True,
-                                        "message": "Illegal action !!",
-                                        "clear": False})
+                    return jsonify({"error": True,
+                                    "message": "Illegal action !!",
+                                    "clear": False})
 
                 if task:
-                    return jsonify(table.to_dict(current_user.get_id()))
+                    return board_changed(table, 'task_added', task.to_dict())
                 return jsonify({"error": True,
                                 "message": status,
                                 "clear": False})
@@ -387,20 +829,29 @@ def move_task(t_name, col_id, task_id):
     table, status = current_user.get_table_by_name(t_name)
 
     if table:
-        if not request.json:
+        if not isinstance(request.json, dict) \
+                or not isinstance(request.json.get('move_to'), str) \
+                or not is_optional_id(request.json.get('after')) \
+                or not is_optional_id(request.json.get('before')):
             return jsonify({"error": True,
                             "message": '''Something is off
                              with what you submitted''',
                             "clear": False})
-        if not table.shared or (table.get_member_by_email(current_user.get_id()) and table.get_member_by_email(current_user.get_id()).get_member_role() in ("creator", "admin", "editor")):
+        if table.get_role(current_user.get_id()).can_edit():
             dest_col_name = request.json.get('move_to')
 
             current_column, _ = table.get_column_by_id(col_id)
             destination, _ = table.get_column_by_name(dest_col_name)
 
             if current_column and destination:
-                if current_column.move_task_to(task_id, destination):
-                    return jsonify(table.to_dict(current_user.get_id()))
+                task = current_column.move_task_to(
+                    task_id, destination,
+                    after_id=request.json.get('after'),
+                    before_id=request.json.get('before'))
+
+                if task:
+                    return board_changed(table, 'task_moved',
+                                         dict(task.to_dict(), from_column_id=col_id))
                 return jsonify({"error": True,
                                 "message": '''Something went wrong !!
                                 Please Try again''',
@@ -426,9 +877,10 @@ def delete_task(t_name, col_name, task_id):
         column, status = table.get_column_by_name(col_name)
 
         if column:
-            if not table.shared or (table.get_member_by_email(current_user.get_id()) and table.get_member_by_email(current_user.get_id()).get_member_role() in ("creator", "admin", "editor")):
+            if table.get_role(current_user.get_id()).can_edit():
                 if column.remove_task_by_id(task_id):
-                    return jsonify(table.to_dict(current_user.get_id()))
+                    return board_changed(table, 'task_deleted',
+                                         {'id': task_id, 'column_id': column.id})
                 return jsonify({"error": True,
                                 "message": "Please submit valid informations",
                                 "clear": False})
@@ -443,6 +895,48 @@ def delete_task(t_name, col_name, task_id):
                     "clear": False})
 
 
+@app.route('/tables/<string:t_name>/tasks/bulk/', methods=['POST'])
+@flask_login.login_required
+def bulk_tasks(t_name):
+    current_user = flask_login.current_user
+
+    if not request.json or not isinstance(request.json.get('operations'), list):
+        return jsonify({"error": True,
+                        "message": "You did not provide any operation",
+                        "clear": False})
+
+    operations = request.json.get('operations')
+
+    if len(operations) > MAX_BULK_OPERATIONS:
+        return jsonify({"error": True,
+                        "message": "You cannot send more than {} operations at once".format(MAX_BULK_OPERATIONS),
+                        "clear": False})
+
+    table, status = current_user.get_table_by_name(t_name)
+
+    if table:
+        results, status = table.apply_task_operations(operations,
+                                                      current_user.get_id())
+
+        if results is not None:
+            realtime.notify(table, 'tasks_changed',
+                            [r for r in results if r['ok']])
+
+            if wants_delta():
+                return jsonify({"error": False,
+                                "results": results,
+                                "version": table.version})
+            response = Response(b''.join((
+                b'{"error":false,"results":', JSON_ENCODER.dumps(results),
+                b',"table":', board_with_role(table), b'}')),
+                mimetype='application/json')
+            response.vary.add('X-Board-Format')
+            return response
+    return jsonify({"error": True,
+                    "message": status,
+                    "clear": False})
+
+
 # ###################-Routes for table's members manipulation-#########################
 @app.route('/tables/<string:table_name>/add-member/', methods=['POST'])
 @flask_login.login_required
@@ -469,8 +963,9 @@ def add_member(table_name):
 
                 if is_user:
                     DATABASE.session.add(member)
+                    table.touch('member_added', member.to_dict)
                     DATABASE.session.commit()
-                    return jsonify(table.to_dict(current_user.get_id()))
+                    return board_changed(table, 'member_added', member.to_dict())
                 return jsonify({"error": True,
                                 "message": "{} is not a user".format(member_email),
                                 "clear": False})
@@ -510,7 +1005,10 @@ def delete_member(table_name):
                 is_member_deleted, status = table.delete_member_by_email(member_email, current_user.get_id())
 
                 if is_member_deleted:
-                    return jsonify(table.to_dict(current_user.get_id()))
+                    response = board_changed(table, 'member_deleted',
+                                             {'member_email': member_email})
+                    realtime.evict(table, member_email)
+                    return response
                 return jsonify({"error": True,
                                 "message": status,
                                 "clear": False})
@@ -549,7 +1047,8 @@ def set_member_as_admin(table_name):
                 is_member_role_updated, status = table.set_member_as_admin(member_email, current_user.get_id())
 
                 if is_member_role_updated:
-                    return jsonify(table.to_dict(current_user.get_id()))
+                    return board_changed(table, 'member_role_changed',
+                                         member.to_dict())
                 return jsonify({"error": True,
                                 "message": status,
                                 "clear": False})
@@ -587,7 +1086,8 @@ def set_member_as_editor(table_name):
                 is_member_role_updated, status = table.set_member_as_editor(member_email, current_user.get_id())
 
                 if is_member_role_updated:
-                    return jsonify(table.to_dict(current_user.get_id()))
+                    return board_changed(table, 'member_role_changed',
+                                         member.to_dict())
                 return jsonify({"error": True,
                                 "message": status,
                                 "clear": False})
@@ -625,7 +1125,8 @@ def set_member_as_visitor(table_name):
                 is_member_role_updated, status = table.set_member_as_visitor(member_email, current_user.get_id())
 
                 if is_member_role_updated:
-                    return jsonify(table.to_dict(current_user.get_id()))
+                    return board_changed(table, 'member_role_changed',
+                                         member.to_dict())
                 return jsonify({"error": True,
                                 "message": status,
                                 "clear": False})
@@ -5867,6 +5867,38 @@ var elm$http$Http$get = function (r) {
 	return elm$http$Http$request(
 		{body: elm$http$Http$emptyBody, expect: r.expect, headers: _List_Nil, method: 'GET', timeout: elm$core$Maybe$Nothing, tracker: elm$core$Maybe$Nothing, url: r.url});
 };
+var elm$http$Http$Header = F2(
+	function (a, b) {
+		return {$: 'Header', a: a, b: b};
+	});
+var elm$http$Http$header = elm$http$Http$Header;
+var author$project$Main$boardFormat = A2(elm$http$Http$header, 'X-Board-Format', 'compact');
+var author$project$Main$getBoard = function (request) {
+	return elm$http$Http$request(
+		{
+			body: elm$http$Http$emptyBody,
+			expect: request.expect,
+			headers: _List_fromArray(
+				[author$project$Main$boardFormat]),
+			method: 'GET',
+			timeout: elm$core$Maybe$Nothing,
+			tracker: elm$core$Maybe$Nothing,
+			url: request.url
+		});
+};
+var author$project$Main$postBoard = function (request) {
+	return elm$http$Http$request(
+		{
+			body: request.body,
+			expect: request.expect,
+			headers: _List_fromArray(
+				[author$project$Main$boardFormat]),
+			method: 'POST',
+			timeout: elm$core$Maybe$Nothing,
+			tracker: elm$core$Maybe$Nothing,
+			url: request.url
+		});
+};
 var author$project$Main$initialModel = F3(
 	function (flags, url, key) {
 		return _Utils_Tuple2(
@@ -5896,6 +5928,9 @@ var author$project$Main$initialModel = F3(
 var author$project$Main$GotTable = function (a) {
 	return {$: 'GotTable', a: a};
 };
+var author$project$Main$GotChangedTable = function (a) {
+	return {$: 'GotChangedTable', a: a};
+};
 var author$project$Main$State_ViewMemberOptions = {$: 'State_ViewMemberOptions'};
 var elm$json$Json$Decode$bool = _Json_decodeBool;
 var elm$json$Json$Decode$map3 = _Json_map3;
@@ -5960,7 +5995,7 @@ var author$project$Main$decodeMember = A5(
 	A2(elm$json$Json$Decode$field, 'member_email', elm$json$Json$Decode$string),
 	A2(elm$json$Json$Decode$field, 'member_role', elm$json$Json$Decode$string));
 var elm$json$Json$Decode$map6 = _Json_map6;
-var author$project$Main$decodeTable = A7(
+var author$project$Main$decodeFullTable = A7(
 	elm$json$Json$Decode$map6,
 	author$project$Main$Table,
 	A2(elm$json$Json$Decode$field, 'id', elm$json$Json$Decode$int),
@@ -5977,6 +6012,156 @@ var author$project$Main$decodeTable = A7(
 		elm$json$Json$Decode$nullable(
 			elm$json$Json$Decode$list(author$project$Main$decodeMember))),
 	A2(elm$json$Json$Decode$field, 'current_user_role', elm$json$Json$Decode$string));
+var elm$json$Json$Decode$andThen = _Json_andThen;
+var elm$core$List$map3 = _List_map3;
+var elm$core$Tuple$pair = F2(
+	function (a, b) {
+		return _Utils_Tuple2(a, b);
+	});
+var elm$json$Json$Decode$fail = _Json_fail;
+var author$project$Main$decodeInterned = function (values) {
+	return A2(
+		elm$json$Json$Decode$andThen,
+		function (index) {
+			var _n0 = elm$core$List$head(
+				A2(elm$core$List$drop, index, values));
+			if (_n0.$ === 'Just') {
+				var value = _n0.a;
+				return _Json_succeed(value);
+			} else {
+				return elm$json$Json$Decode$fail(
+					'No interned value at index ' + elm$core$String$fromInt(index));
+			}
+		},
+		elm$json$Json$Decode$int);
+};
+var author$project$Main$decodeCompactMembers = function (tableId) {
+	return A2(
+		elm$json$Json$Decode$andThen,
+		function (_n0) {
+			var emails = _n0.a;
+			var roles = _n0.b;
+			return A2(
+				elm$json$Json$Decode$field,
+				'members',
+				A4(
+					elm$json$Json$Decode$map3,
+					elm$core$List$map3(
+						F3(
+							function (id, email, role) {
+								return A4(author$project$Main$Member, id, tableId, email, role);
+							})),
+					A2(
+						elm$json$Json$Decode$field,
+						'id',
+						elm$json$Json$Decode$list(elm$json$Json$Decode$int)),
+					A2(
+						elm$json$Json$Decode$field,
+						'email',
+						elm$json$Json$Decode$list(
+							author$project$Main$decodeInterned(emails))),
+					A2(
+						elm$json$Json$Decode$field,
+						'role',
+						elm$json$Json$Decode$list(
+							author$project$Main$decodeInterned(roles)))));
+		},
+		A3(
+			elm$json$Json$Decode$map2,
+			elm$core$Tuple$pair,
+			A2(
+				elm$json$Json$Decode$field,
+				'emails',
+				elm$json$Json$Decode$list(elm$json$Json$Decode$string)),
+			A2(
+				elm$json$Json$Decode$field,
+				'roles',
+				elm$json$Json$Decode$list(elm$json$Json$Decode$string))));
+};
+var author$project$Main$decodeCompactTasks = function (columnId) {
+	return A3(
+		elm$json$Json$Decode$map2,
+		elm$core$List$map2(
+			F2(
+				function (id, description) {
+					return A3(author$project$Main$Task, id, description, columnId);
+				})),
+		A2(
+			elm$json$Json$Decode$field,
+			'id',
+			elm$json$Json$Decode$list(elm$json$Json$Decode$int)),
+		A2(
+			elm$json$Json$Decode$field,
+			'description',
+			elm$json$Json$Decode$list(elm$json$Json$Decode$string)));
+};
+var author$project$Main$decodeCompactColumn = function (tableId) {
+	return A2(
+		elm$json$Json$Decode$andThen,
+		function (columnId) {
+			return A5(
+				elm$json$Json$Decode$map4,
+				author$project$Main$Column,
+				_Json_succeed(columnId),
+				A2(elm$json$Json$Decode$field, 'name', elm$json$Json$Decode$string),
+				_Json_succeed(tableId),
+				A2(
+					elm$json$Json$Decode$field,
+					'tasks',
+					A2(
+						elm$json$Json$Decode$map,
+						elm$core$Maybe$Just,
+						author$project$Main$decodeCompactTasks(columnId))));
+		},
+		A2(elm$json$Json$Decode$field, 'id', elm$json$Json$Decode$int));
+};
+var author$project$Main$decodeCompactTable = A2(
+	elm$json$Json$Decode$andThen,
+	function (tableId) {
+		return A7(
+			elm$json$Json$Decode$map6,
+			author$project$Main$Table,
+			_Json_succeed(tableId),
+			A2(elm$json$Json$Decode$field, 'name', elm$json$Json$Decode$string),
+			A2(elm$json$Json$Decode$field, 'creator', elm$json$Json$Decode$string),
+			A2(
+				elm$json$Json$Decode$field,
+				'columns',
+				elm$json$Json$Decode$nullable(
+					elm$json$Json$Decode$list(
+						author$project$Main$decodeCompactColumn(tableId)))),
+			A2(
+				elm$json$Json$Decode$map,
+				elm$core$Maybe$Just,
+				author$project$Main$decodeCompactMembers(tableId)),
+			A2(elm$json$Json$Decode$field, 'current_user_role', elm$json$Json$Decode$string));
+	},
+	A2(elm$json$Json$Decode$field, 'id', elm$json$Json$Decode$int));
+var elm$json$Json$Decode$maybe = function (decoder) {
+	return elm$json$Json$Decode$oneOf(
+		_List_fromArray(
+			[
+				A2(elm$json$Json$Decode$map, elm$core$Maybe$Just, decoder),
+				_Json_succeed(elm$core$Maybe$Nothing)
+			]));
+};
+var author$project$Main$decodeTable = A2(
+	elm$json$Json$Decode$andThen,
+	function (format) {
+		if (format.$ === 'Nothing') {
+			return author$project$Main$decodeFullTable;
+		} else {
+			if (format.a === 1) {
+				return author$project$Main$decodeCompactTable;
+			} else {
+				var version = format.a;
+				return elm$json$Json$Decode$fail(
+					'Unknown board format ' + elm$core$String$fromInt(version));
+			}
+		}
+	},
+	elm$json$Json$Decode$maybe(
+		A2(elm$json$Json$Decode$field, 'format', elm$json$Json$Decode$int)));
 var elm$core$Basics$not = _Basics_not;
 var elm$core$List$drop = F2(
 	function (n, list) {
@@ -6135,6 +6320,7 @@ var elm$json$Json$Encode$object = function (pairs) {
 			pairs));
 };
 var elm$json$Json$Encode$string = _Json_wrap;
+var author$project$Main$watchBoard = _Platform_outgoingPort('watchBoard', elm$json$Json$Encode$string);
 var elm$url$Url$addPort = F2(
 	function (maybePort, starter) {
 		if (maybePort.$ === 'Nothing') {
@@ -6241,7 +6427,7 @@ var author$project$Main$updatePrivateTables = F2(
 			case 'RenameTable':
 				return _Utils_Tuple2(
 					model,
-					elm$http$Http$post(
+					author$project$Main$postBoard(
 						{
 							body: elm$http$Http$jsonBody(
 								function (input) {
@@ -6284,7 +6470,7 @@ var author$project$Main$updatePrivateTables = F2(
 					_Utils_update(
 						model,
 						{application_state: author$project$Main$State_ViewPrivateTable}),
-					elm$http$Http$get(
+					author$project$Main$getBoard(
 						{
 							expect: A2(elm$http$Http$expectJson, author$project$Main$GotTable, author$project$Main$decodeTable),
 							url: elm$url$Url$toString(model.url)
@@ -6348,7 +6534,7 @@ var author$project$Main$updateTablesSharedWithMe = F2(
 					_Utils_update(
 						model,
 						{application_state: author$project$Main$State_ViewTableSharedWithMe}),
-					elm$http$Http$get(
+					author$project$Main$getBoard(
 						{
 							expect: A2(elm$http$Http$expectJson, author$project$Main$GotTable, author$project$Main$decodeTable),
 							url: elm$url$Url$toString(model.url)
@@ -6412,7 +6598,7 @@ var author$project$Main$updateTablesSharedWithOthers = F2(
 					_Utils_update(
 						model,
 						{application_state: author$project$Main$State_ViewTableSharedWithOthers}),
-					elm$http$Http$get(
+					author$project$Main$getBoard(
 						{
 							expect: A2(elm$http$Http$expectJson, author$project$Main$GotTable, author$project$Main$decodeTable),
 							url: elm$url$Url$toString(model.url)
@@ -6677,7 +6863,7 @@ var author$project$Main$update = F2(
 								input_field_task: '',
 								server_response: A3(author$project$Main$ServerResponse, false, '', false)
 							}),
-						elm$core$Platform$Cmd$none);
+						author$project$Main$watchBoard(table.name));
 				} else {
 					var error = msg.a.a;
 					if (error.$ === 'BadBody') {
@@ -6704,12 +6890,40 @@ var author$project$Main$update = F2(
 						return _Utils_Tuple2(model, elm$core$Platform$Cmd$none);
 					}
 				}
+			case 'BoardChanged':
+				var table_id = msg.a;
+				var _n1 = model.current_table;
+				if (_n1.$ === 'Just') {
+					var table = _n1.a;
+					return _Utils_eq(table.id, table_id) ? _Utils_Tuple2(
+						model,
+						author$project$Main$getBoard(
+							{
+								expect: A2(elm$http$Http$expectJson, author$project$Main$GotChangedTable, author$project$Main$decodeTable),
+								url: '/tables/' + table.name
+							})) : _Utils_Tuple2(model, elm$core$Platform$Cmd$none);
+				} else {
+					return _Utils_Tuple2(model, elm$core$Platform$Cmd$none);
+				}
+			case 'GotChangedTable':
+				if (msg.a.$ === 'Ok') {
+					var table = msg.a.a;
+					return _Utils_Tuple2(
+						_Utils_update(
+							model,
+							{
+								current_table: elm$core$Maybe$Just(table)
+							}),
+						elm$core$Platform$Cmd$none);
+				} else {
+					return _Utils_Tuple2(model, elm$core$Platform$Cmd$none);
+				}
 			case 'AddPrivateTable':
 				return A2(author$project$Main$updatePrivateTables, msg, model);
 			case 'AddColumn':
 				return _Utils_Tuple2(
 					model,
-					elm$http$Http$post(
+					author$project$Main$postBoard(
 						{
 							body: elm$http$Http$jsonBody(
 								elm$json$Json$Encode$object(
@@ -6733,7 +6947,7 @@ var author$project$Main$update = F2(
 			case 'AddTask':
 				return _Utils_Tuple2(
 					model,
-					elm$http$Http$post(
+					author$project$Main$postBoard(
 						{
 							body: elm$http$Http$jsonBody(
 								elm$json$Json$Encode$object(
@@ -6749,7 +6963,7 @@ var author$project$Main$update = F2(
 			case 'AddMember':
 				return _Utils_Tuple2(
 					model,
-					elm$http$Http$post(
+					author$project$Main$postBoard(
 						{
 							body: elm$http$Http$jsonBody(
 								elm$json$Json$Encode$object(
@@ -6801,7 +7015,7 @@ var author$project$Main$update = F2(
 			case 'DeleteColumn':
 				return _Utils_Tuple2(
 					model,
-					elm$http$Http$get(
+					author$project$Main$getBoard(
 						{
 							expect: A2(elm$http$Http$expectJson, author$project$Main$GotTable, author$project$Main$decodeTable),
 							url: elm$url$Url$toString(model.url)
@@ -6809,7 +7023,7 @@ var author$project$Main$update = F2(
 			case 'DeleteTask':
 				return _Utils_Tuple2(
 					model,
-					elm$http$Http$get(
+					author$project$Main$getBoard(
 						{
 							expect: A2(elm$http$Http$expectJson, author$project$Main$GotTable, author$project$Main$decodeTable),
 							url: elm$url$Url$toString(model.url)
@@ -6819,7 +7033,7 @@ var author$project$Main$update = F2(
 					_Utils_update(
 						model,
 						{application_state: model.last_application_state}),
-					elm$http$Http$post(
+					author$project$Main$postBoard(
 						{
 							body: elm$http$Http$jsonBody(
 								elm$json$Json$Encode$object(
@@ -6941,7 +7155,7 @@ var author$project$Main$update = F2(
 						_Utils_update(
 							model,
 							{taskBeingDragged: elm$core$Maybe$Nothing}),
-						elm$http$Http$post(
+						author$project$Main$postBoard(
 							{
 								body: elm$http$Http$jsonBody(
 									function (input) {
@@ -6970,7 +7184,7 @@ var author$project$Main$update = F2(
 					_Utils_update(
 						model,
 						{application_state: model.last_application_state}),
-					elm$http$Http$post(
+					author$project$Main$postBoard(
 						{
 							body: elm$http$Http$jsonBody(
 								elm$json$Json$Encode$object(
@@ -6997,7 +7211,7 @@ var author$project$Main$update = F2(
 					_Utils_update(
 						model,
 						{application_state: model.last_application_state}),
-					elm$http$Http$post(
+					author$project$Main$postBoard(
 						{
 							body: elm$http$Http$jsonBody(
 								elm$json$Json$Encode$object(
@@ -7024,7 +7238,7 @@ var author$project$Main$update = F2(
 					_Utils_update(
 						model,
 						{application_state: model.last_application_state}),
-					elm$http$Http$post(
+					author$project$Main$postBoard(
 						{
 							body: elm$http$Http$jsonBody(
 								elm$json$Json$Encode$object(
@@ -8400,12 +8614,17 @@ var elm$core$Basics$always = F2(
 	});
 var elm$core$Platform$Sub$batch = _Platform_batch;
 var elm$core$Platform$Sub$none = elm$core$Platform$Sub$batch(_List_Nil);
+var author$project$Main$BoardChanged = function (a) {
+	return {$: 'BoardChanged', a: a};
+};
+var author$project$Main$boardChanged = _Platform_incomingPort('boardChanged', elm$json$Json$Decode$int);
 var author$project$Main$main = elm$browser$Browser$application(
 	{
 		init: author$project$Main$initialModel,
 		onUrlChange: author$project$Main$UrlChanged,
 		onUrlRequest: author$project$Main$LinkClicked,
-		subscriptions: elm$core$Basics$always(elm$core$Platform$Sub$none),
+		subscriptions: elm$core$Basics$always(
+			author$project$Main$boardChanged(author$project$Main$BoardChanged)),
 		update: author$project$Main$update,
 		view: author$project$Main$view
 	});
@@ -0,0 +1,164 @@
+/* Keeps the board on screen up to date. Joins the Socket.IO room of the
+   board the Elm application shows, through its watchBoard port, and tells
+   it through its boardChanged port whenever that board changes.
+
+   The server runs python-socketio in threading mode, which only offers
+   Engine.IO 3 long-polling: this is a client for that transport alone, one
+   request waiting for the server's packets at a time and one request for
+   every packet sent. After a lost connection it connects again and has the
+   board reloaded, the changes made meanwhile were not pushed. */
+var Realtime = (function () {
+    var PATH = '/socket.io/?EIO=3&transport=polling&b64=1';
+    var RETRY_MS = 5000;
+
+    // Payloads are '<length>:<packet>' for every packet, the length being
+    // counted in characters
+    function encode(packets) {
+        return packets.map(function (packet) {
+            return Array.from(packet).length + ':' + packet;
+        }).join('');
+    }
+
+    function decode(payload) {
+        var characters = Array.from(payload);
+        var packets = [];
+        var index = 0;
+
+        while (index < characters.length) {
+            var colon = characters.indexOf(':', index);
+
+            if (colon < 0) {
+                break;
+            }
+            var length = parseInt(characters.slice(index, colon).join(''), 10);
+            packets.push(characters.slice(colon + 1, colon + 1 + length).join(''));
+            index = colon + 1 + length;
+        }
+        return packets;
+    }
+
+    function connect(app) {
+        if (!app.ports || !app.ports.watchBoard || !app.ports.boardChanged) {
+            return;
+        }
+
+        var session = null;
+        var board = null;
+        var acks = {};
+        var lastAck = 0;
+
+        function request(method, body) {
+            var url = PATH + '&t=' + Date.now() + (session ? '&sid=' + session.id : '');
+            var options = {method: method, credentials: 'same-origin', cache: 'no-store'};
+
+            if (body !== undefined) {
+                options.body = body;
+                options.headers = {'Content-Type': 'text/plain;charset=UTF-8'};
+            }
+            return fetch(url, options).then(function (response) {
+                if (!response.ok) {
+                    throw new Error('Socket.IO answered ' + response.status);
+                }
+                return response.text();
+            });
+        }
+
+        function send(packet) {
+            if (session) {
+                request('POST', encode([packet])).catch(reconnect);
+            }
+        }
+
+        function join(name, reload) {
+            board = name;
+
+            if (session) {
+                lastAck += 1;
+                acks[lastAck] = reload;
+                send('42' + lastAck + JSON.stringify(['join', {table: name}]));
+            }
+        }
+
+        function open() {
+            session = null;
+            request('GET').then(function (payload) {
+                var packets = decode(payload);
+                var handshake = JSON.parse(packets.shift().slice(1));
+                var current = {id: handshake.sid, pinger: null};
+
+                session = current;
+                current.pinger = setInterval(function () { send('2'); },
+                                             handshake.pingInterval);
+                packets.forEach(receive);
+
+                if (board !== null) {
+                    join(board, true);
+                }
+                poll(current);
+            }).catch(function () {
+                setTimeout(open, RETRY_MS);
+            });
+        }
+
+        function poll(current) {
+            request('GET').then(function (payload) {
+                if (session === current) {
+                    decode(payload).forEach(receive);
+                    poll(current);
+                }
+            }).catch(function () {
+                if (session === current) {
+                    reconnect();
+                }
+            });
+        }
+
+        function reconnect() {
+            if (session) {
+                clearInterval(session.pinger);
+                session = null;
+                setTimeout(open, RETRY_MS);
+            }
+        }
+
+        function receive(packet) {
+            // Engine.IO: 1 close, 3 pong, 4 message, 6 noop
+            if (packet[0] === '1') {
+                reconnect();
+            } else if (packet[0] === '4') {
+                receiveMessage(packet.slice(1));
+            }
+        }
+
+        function receiveMessage(message) {
+            // Socket.IO: 2 event, 3 acknowledgement of an event sent
+            var json = message.search(/[\[{]/);
+
+            if (message[0] === '2' && json > 0) {
+                var event = JSON.parse(message.slice(json));
+
+                if (event[0] === 'board_changed') {
+                    app.ports.boardChanged.send(event[1].table_id);
+                }
+            } else if (message[0] === '3' && json > 0) {
+                var id = parseInt(message.slice(1, json), 10);
+                var result = JSON.parse(message.slice(json))[0];
+
+                // Joined again after losing the connection
+                if (acks[id] && result && !result.error) {
+                    app.ports.boardChanged.send(result.table_id);
+                }
+                delete acks[id];
+            }
+        }
+
+        app.ports.watchBoard.subscribe(function (name) {
+            if (name !== board) {
+                join(name, false);
+            }
+        });
+        open();
+    }
+
+    return {connect: connect, encode: encode, decode: decode};
+})();
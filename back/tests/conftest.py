@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+# server.py creates the application on import, from the profile the
+# environment names
+os.environ['TRELLO_CONFIG'] = 'testing'
+os.environ.pop('DATABASE_URL', None)
+os.environ.pop('TRELLO_SETTINGS', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+from board_cache import BOARD_CACHE  # noqa: E402
+from database import DATABASE  # noqa: E402
+from user_cache import USER_CACHE  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    '''The application, its in-memory database and caches emptied after the
+       test.'''
+    with server.app.app_context():
+        yield server.app
+        DATABASE.session.remove()
+
+        for table in reversed(DATABASE.metadata.sorted_tables):
+            DATABASE.session.execute(table.delete())
+        DATABASE.session.commit()
+        BOARD_CACHE.clear()
+        USER_CACHE.clear()
+
+
+@pytest.fixture
+def count_queries(app):
+    '''Return a function running its argument and returning the number of
+       SQL statements it ran, starting from an empty session.'''
+    def count(function, *args):
+        DATABASE.session.remove()
+        statements = []
+        listener = lambda *_: statements.append(1)  # noqa: E731
+        event.listen(DATABASE.engine, 'before_cursor_execute', listener)
+
+        try:
+            function(*args)
+        finally:
+            event.remove(DATABASE.engine, 'before_cursor_execute', listener)
+        return len(statements)
+    return count
+
+
+@pytest.fixture
+def login(app):
+    '''Return a function signing up and logging in a user, returning the
+       test client the user is logged in with.'''
+    def log_in(email, name):
+        client = app.test_client()
+        credentials = {'email': email, 'name': name, 'password': 'password'}
+        client.post('/signup/', json=credentials)
+        response = client.post('/login/', json=credentials)
+        assert not response.get_json()['error']
+        return client
+    return log_in
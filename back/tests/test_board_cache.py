@@ -0,0 +1,44 @@
+'''The cached boards are those of the current version of their table.'''
+from board_cache import BOARD_CACHE
+
+OWNER = 'owner@example.com'
+
+
+def create_board(client, task):
+    '''Create the board with a column holding the task, return the board.'''
+    client.post('/tables/add-table', json={'table_name': 'board'})
+    client.post('/tables/board/add-column/', json={'column_name': 'todo'})
+    client.post('/tables/board/columns/todo/add-task/',
+                json={'description': task})
+    return client.get('/tables/board').get_json()
+
+
+def tasks(board):
+    return [task['description'] for task in board['columns'][0]['tasks']]
+
+
+def test_changed_board_is_not_served_from_the_cache(login):
+    client = login(OWNER, 'owner')
+    board = create_board(client, 'first')
+    assert BOARD_CACHE.get(board['id'], board['version']) is not None
+
+    client.post('/tables/board/columns/todo/add-task/',
+                json={'description': 'second'})
+    assert BOARD_CACHE.get(board['id'], board['version']) is None
+    assert tasks(client.get('/tables/board').get_json()) == ['first',
+                                                             'second']
+
+
+def test_recreated_board_is_not_served_from_the_cache(login):
+    client = login(OWNER, 'owner')
+    deleted = create_board(client, 'deleted')
+    body = BOARD_CACHE.get(deleted['id'], deleted['version'])
+    client.get('/tables/private-tables/delete-table/board')
+    create_board(client, 'created')
+
+    # As on another worker, which heard of neither the deletion nor the
+    # changes made to the new board
+    BOARD_CACHE.clear()
+    BOARD_CACHE.put(deleted['id'], deleted['version'], body)
+
+    assert tasks(client.get('/tables/board').get_json()) == ['created']
@@ -0,0 +1,51 @@
+'''A board is answered with 304 Not Modified only while the board the ETag
+was given for is unchanged.'''
+OWNER = 'owner@example.com'
+
+
+def create_board(client, name='board'):
+    '''Create the board with a column and a task, return the board.'''
+    client.post('/tables/add-table', json={'table_name': name})
+    client.post('/tables/{}/add-column/'.format(name),
+                json={'column_name': 'todo'})
+    client.post('/tables/{}/columns/todo/add-task/'.format(name),
+                json={'description': 'first'})
+    return client.get('/tables/' + name).get_json()
+
+
+def get_board(client, etag, name='board'):
+    return client.get('/tables/' + name, headers={'If-None-Match': etag})
+
+
+def test_unchanged_board_is_not_modified(login):
+    client = login(OWNER, 'owner')
+    create_board(client)
+    etag = client.get('/tables/board').headers['ETag']
+
+    assert get_board(client, etag).status_code == 304
+
+
+def test_changed_board_is_answered(login):
+    client = login(OWNER, 'owner')
+    create_board(client)
+    etag = client.get('/tables/board').headers['ETag']
+    client.post('/tables/board/columns/todo/add-task/',
+                json={'description': 'second'})
+    response = get_board(client, etag)
+
+    assert response.status_code == 200
+    assert len(response.get_json()['columns'][0]['tasks']) == 2
+
+
+def test_recreated_board_is_answered(login):
+    client = login(OWNER, 'owner')
+    deleted = create_board(client)
+    etag = client.get('/tables/board').headers['ETag']
+    client.get('/tables/private-tables/delete-table/board')
+    created = create_board(client)
+    response = get_board(client, etag)
+
+    assert created['id'] != deleted['id']
+    assert created['version'] == deleted['version']
+    assert response.status_code == 200
+    assert response.get_json()['id'] == created['id']
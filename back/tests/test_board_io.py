@@ -0,0 +1,35 @@
+'''Importing an exported board.'''
+import json
+
+import pytest
+
+from board_io import FORMAT, import_board
+from models.members import Members
+from models.tables import Tables
+
+OWNER = 'owner@example.com'
+MEMBER = 'member@example.com'
+
+
+def export(role):
+    records = [{'type': 'table', 'format': FORMAT, 'id': 1, 'name': 'board',
+                'creator': 'someone@example.com', 'shared': True,
+                'version': 3},
+               {'type': 'member', 'id': 1, 'email': MEMBER, 'role': role}]
+    return [json.dumps(record).encode('utf-8') + b'\n' for record in records]
+
+
+@pytest.mark.parametrize('role, imported', [
+    ('creator', 'admin'), ('admin', 'admin'), ('editor', 'editor'),
+    ('visitor', 'visitor'), (None, 'visitor'), ('owner', 'visitor'),
+    (['admin'], 'visitor')])
+def test_imported_member_roles(login, role, imported):
+    login(OWNER, 'owner')
+    login(MEMBER, 'member')
+    name, counts = import_board(export(role), OWNER)
+    table = Tables.query.filter_by(name=name).one()
+    roles = {member.user_id: member.role for member in
+             Members.query.filter_by(table_id=table.id)}
+
+    assert roles == {OWNER: 'creator', MEMBER: imported}
+    assert counts['members'] == 2
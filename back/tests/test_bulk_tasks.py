@@ -0,0 +1,104 @@
+'''Bulk task operations report each invalid operation and apply the others
+in a single transaction.'''
+import server
+
+
+def board(client):
+    client.post('/tables/add-table', json={'table_name': 'board'})
+
+    for name in ('todo', 'done'):
+        client.post('/tables/board/add-column/', json={'column_name': name})
+
+
+def bulk(client, *operations):
+    return client.post('/tables/board/tasks/bulk/',
+                       json={'operations': list(operations)}).get_json()
+
+
+def tasks(client):
+    table = client.get('/tables/board').get_json()
+    return {column['name']: [task['description'] for task in column['tasks']]
+            for column in table['columns']}
+
+
+def test_operations_are_applied_in_order(app, login):
+    client = login('alice@example.com', 'alice')
+    board(client)
+    added = bulk(client,
+                 {'op': 'add', 'column': 'todo', 'description': 'one'},
+                 {'op': 'add', 'column': 'todo', 'description': 'two'},
+                 {'op': 'add', 'column': 'todo', 'description': 'three'})
+    ids = [result['task']['id'] for result in added['results']]
+
+    response = bulk(client,
+                    {'op': 'move', 'task_id': ids[0], 'move_to': 'done'},
+                    {'op': 'delete', 'task_id': ids[1]},
+                    {'op': 'move', 'task_id': ids[2], 'move_to': 'done'})
+
+    assert all(result['ok'] for result in response['results'])
+    assert tasks(client) == {'todo': [], 'done': ['one', 'three']}
+
+
+def test_invalid_operations_are_reported_and_skipped(app, login):
+    client = login('alice@example.com', 'alice')
+    board(client)
+    task_id = bulk(client, {'op': 'add', 'column': 'todo',
+                            'description': 'one'})['results'][0]['task']['id']
+
+    response = bulk(client,
+                    'not an operation',
+                    {'op': 'add', 'column': 'nowhere', 'description': 'two'},
+                    {'op': 'add', 'column': 'todo', 'description': ''},
+                    {'op': 'move', 'task_id': task_id, 'move_to': 'nowhere'},
+                    {'op': 'move', 'task_id': True, 'move_to': 'done'},
+                    {'op': 'delete', 'task_id': [task_id]},
+                    {'op': 'delete', 'task_id': task_id + 1000},
+                    {'op': 'delete', 'task_id': 2 ** 63},
+                    {'op': 'rename', 'task_id': task_id},
+                    {'op': 'add', 'column': 'done', 'description': 'three'})
+
+    assert [result['ok'] for result in response['results']] == \
+        [False] * 9 + [True]
+    assert response['results'][4]['message'] == 'Task not found'
+    assert tasks(client) == {'todo': ['one'], 'done': ['three']}
+
+
+def test_a_task_is_deleted_once(app, login):
+    client = login('alice@example.com', 'alice')
+    board(client)
+    task_id = bulk(client, {'op': 'add', 'column': 'todo',
+                            'description': 'one'})['results'][0]['task']['id']
+
+    response = bulk(client,
+                    {'op': 'delete', 'task_id': task_id},
+                    {'op': 'move', 'task_id': task_id, 'move_to': 'done'},
+                    {'op': 'delete', 'task_id': task_id})
+
+    assert [result['ok'] for result in response['results']] == \
+        [True, False, False]
+    assert tasks(client) == {'todo': [], 'done': []}
+
+
+def test_too_many_operations_are_refused(app, login):
+    client = login('alice@example.com', 'alice')
+    board(client)
+    operation = {'op': 'add', 'column': 'todo', 'description': 'one'}
+
+    response = bulk(client, *[operation] * (server.MAX_BULK_OPERATIONS + 1))
+
+    assert response['error']
+    assert tasks(client) == {'todo': [], 'done': []}
+
+
+def test_visitors_cannot_change_tasks(app, login):
+    alice = login('alice@example.com', 'alice')
+    bob = login('bob@example.com', 'bobby')
+    board(alice)
+    alice.get('/tables/private-tables/board/share/')
+    alice.post('/tables/board/add-member/',
+               json={'member_email': 'bob@example.com'})
+
+    response = bulk(bob, {'op': 'add', 'column': 'todo', 'description': 'x'})
+
+    assert response['error']
+    assert tasks(alice) == {'todo': [], 'done': []}
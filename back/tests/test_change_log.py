@@ -0,0 +1,87 @@
+'''Clients catch up with the changes made to a board since their version, or
+are told to reload it.'''
+from change_log import CHANGE_LOG
+from models.tables import rebalance_table
+
+OWNER = 'owner@example.com'
+
+
+def create_board(client, tasks):
+    client.post('/tables/add-table', json={'table_name': 'board'})
+    client.post('/tables/board/add-column/', json={'column_name': 'todo'})
+
+    for number in range(tasks):
+        client.post('/tables/board/columns/todo/add-task/',
+                    json={'description': 'task {}'.format(number)})
+    return client.get('/tables/board').get_json()
+
+
+def changes(client, board, since):
+    return client.get('/tables/{}/changes?since={}'.format(board['id'],
+                                                            since)).get_json()
+
+
+def test_changes_since_a_version(login):
+    client = login(OWNER, 'owner')
+    board = create_board(client, 2)
+    response = changes(client, board, 0)
+
+    assert board['version'] == 3
+    assert not response['resync']
+    assert [(change['version'], change['type'])
+            for change in response['changes']] == [(1, 'column_added'),
+                                                   (2, 'task_added'),
+                                                   (3, 'task_added')]
+    assert response['changes'][2]['data']['description'] == 'task 1'
+    assert changes(client, board, 2)['changes'] == response['changes'][2:]
+
+
+def test_up_to_date_client(login):
+    client = login(OWNER, 'owner')
+    board = create_board(client, 2)
+
+    assert changes(client, board, 3) == {'error': False, 'version': 3,
+                                         'resync': False, 'changes': []}
+
+
+def test_unknown_version_resyncs(login):
+    client = login(OWNER, 'owner')
+    board = create_board(client, 2)
+
+    for since in (4, -1):
+        response = changes(client, board, since)
+        assert response['resync'] and response['changes'] == []
+
+
+def test_compacted_changes_resync(login, monkeypatch):
+    monkeypatch.setattr(CHANGE_LOG, 'keep', 2)
+    client = login(OWNER, 'owner')
+    board = create_board(client, 4)
+
+    assert board['version'] == 5
+    assert changes(client, board, 2)['resync']
+
+    response = changes(client, board, 3)
+    assert not response['resync']
+    assert [change['version'] for change in response['changes']] == [4, 5]
+
+
+def test_other_users_do_not_see_the_changes(login):
+    board = create_board(login(OWNER, 'owner'), 1)
+    response = changes(login('other@example.com', 'other'), board, 0)
+
+    assert response['error'] and 'changes' not in response
+
+
+def test_rebalancing_logs_the_new_ranks(login):
+    client = login(OWNER, 'owner')
+    board = create_board(client, 0)
+    client.post('/tables/board/add-column/', json={'column_name': 'done'})
+    rebalance_table(board['id'])
+    board = client.get('/tables/board').get_json()
+    change = changes(client, board, board['version'] - 1)['changes'][0]
+
+    assert change['type'] == 'columns_rebalanced'
+    assert change['data'] == {'positions': {
+        str(column['id']): column['position']
+        for column in board['columns']}}
@@ -0,0 +1,151 @@
+'''Moving tasks and columns only ranks the moved row among the others.'''
+import pytest
+
+from database import DATABASE
+from models.columns import rebalance_column
+from models.tasks import Tasks
+from ranking import rank_between, sequence, spread
+
+OWNER = 'owner@example.com'
+
+
+def create_board(client):
+    '''Create a board with the columns todo and done, tasks a, b and c in
+       todo, return the ids of the columns and of the tasks.'''
+    client.post('/tables/add-table', json={'table_name': 'board'})
+
+    for column in ('todo', 'done'):
+        client.post('/tables/board/add-column/', json={'column_name': column})
+
+    for task in 'abc':
+        client.post('/tables/board/columns/todo/add-task/',
+                    json={'description': task})
+    return ids(client.get('/tables/board').get_json())
+
+
+def ids(board):
+    columns = {column['name']: column['id'] for column in board['columns']}
+    tasks = {task['description']: task['id']
+             for column in board['columns'] for task in column['tasks']}
+    return columns, tasks
+
+
+def order(client):
+    '''Return the names of the columns and tasks of the board in order.'''
+    board = client.get('/tables/board').get_json()
+    return [(column['name'], [task['description'] for task in column['tasks']])
+            for column in board['columns']]
+
+
+def move_task(client, columns, task_id, **body):
+    url = '/tables/board/columns/{}/tasks/task/{}/move/'.format(
+        columns['todo'], task_id)
+    return client.post(url, json=body).get_json()
+
+
+def move_column(client, column_id, body):
+    url = '/tables/board/columns/{}/move/'.format(column_id)
+    return client.post(url, json=body).get_json()
+
+
+def test_ranks():
+    assert 'A' < rank_between('A', 'B') < 'B'
+    assert rank_between('A', None) > 'A'
+    assert rank_between(None, 'A') < 'A'
+    assert rank_between('A', 'A1') == 'A0V'
+
+    with pytest.raises(ValueError):
+        rank_between('B', 'A')
+
+    ranks = spread(100)
+    assert ranks == sorted(ranks) and len(set(ranks)) == 100
+
+    generated = sequence()
+    ranks = [next(generated) for _ in range(5000)]
+    assert ranks == sorted(ranks) and len(set(ranks)) == 5000
+    assert not any(rank.endswith('0') for rank in ranks)
+
+
+def test_moving_tasks(login):
+    client = login(OWNER, 'owner')
+    columns, tasks = create_board(client)
+
+    assert not move_task(client, columns, tasks['c'], move_to='todo',
+                         after=tasks['a']).get('error')
+    assert order(client) == [('todo', ['a', 'c', 'b']), ('done', [])]
+
+    assert not move_task(client, columns, tasks['b'], move_to='todo',
+                         before=tasks['a']).get('error')
+    assert order(client) == [('todo', ['b', 'a', 'c']), ('done', [])]
+
+    assert not move_task(client, columns, tasks['a'],
+                         move_to='done').get('error')
+    assert order(client) == [('todo', ['b', 'c']), ('done', ['a'])]
+
+
+def test_moving_columns(login):
+    client = login(OWNER, 'owner')
+    columns, _ = create_board(client)
+
+    assert not move_column(client, columns['done'],
+                           {'before': columns['todo']}).get('error')
+    assert [name for name, _ in order(client)] == ['done', 'todo']
+
+    assert not move_column(client, columns['done'],
+                           {'after': columns['todo']}).get('error')
+    assert [name for name, _ in order(client)] == ['todo', 'done']
+
+
+CRAFTED_IDS = [[1], True, '1', 1.0, {}, 2 ** 63]
+
+
+@pytest.mark.parametrize('value', CRAFTED_IDS)
+@pytest.mark.parametrize('side', ['after', 'before'])
+def test_moving_a_task_next_to_a_crafted_id(login, side, value):
+    client = login(OWNER, 'owner')
+    columns, tasks = create_board(client)
+    response = move_task(client, columns, tasks['a'], move_to='done',
+                         **{side: value})
+
+    assert response['error']
+    assert order(client) == [('todo', ['a', 'b', 'c']), ('done', [])]
+
+
+@pytest.mark.parametrize('body', [[1], {'move_to': [1]}, {'after': 1}])
+def test_moving_a_task_with_a_crafted_body(login, body):
+    client = login(OWNER, 'owner')
+    columns, tasks = create_board(client)
+    url = '/tables/board/columns/{}/tasks/task/{}/move/'.format(
+        columns['todo'], tasks['a'])
+
+    assert client.post(url, json=body).get_json()['error']
+
+
+@pytest.mark.parametrize('value', CRAFTED_IDS)
+@pytest.mark.parametrize('side', ['after', 'before'])
+def test_moving_a_column_next_to_a_crafted_id(login, side, value):
+    client = login(OWNER, 'owner')
+    columns, _ = create_board(client)
+
+    assert move_column(client, columns['todo'], {side: value})['error']
+    assert move_column(client, columns['todo'], [1])['error']
+    assert [name for name, _ in order(client)] == ['todo', 'done']
+
+
+def test_rebalancing_a_column(login):
+    client = login(OWNER, 'owner')
+    columns, tasks = create_board(client)
+    version = client.get('/tables/board').get_json()['version']
+    long_ranks = {'a': 'V' + 'z' * 40, 'b': 'V' + 'z' * 40 + 'V', 'c': 'W'}
+
+    for description, position in long_ranks.items():
+        Tasks.query.filter_by(id=tasks[description]) \
+            .update({'position': position})
+    DATABASE.session.commit()
+    rebalance_column(columns['todo'])
+    board = client.get('/tables/board').get_json()
+    positions = [task['position'] for task in board['columns'][0]['tasks']]
+
+    assert order(client)[0] == ('todo', ['a', 'b', 'c'])
+    assert positions == spread(3)
+    assert board['version'] == version + 1
@@ -0,0 +1,93 @@
+'''Pages follow the cursor of the previous page, a cursor that isn't one
+gives the first page.'''
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+
+OWNER = 'owner@example.com'
+
+CRAFTED_CURSORS = [[[1]], [[1], 2], [True], [{}, 1], [2 ** 63], ['1', '2']]
+
+
+def test_decoding_a_cursor():
+    assert decode_cursor(encode_cursor(3), int) == [3]
+    assert decode_cursor(encode_cursor('K', 3), str, int) == ['K', 3]
+    assert decode_cursor(encode_cursor(-1.5, 3), (int, float), int) == [-1.5,
+                                                                        3]
+
+
+@pytest.mark.parametrize('values', CRAFTED_CURSORS + [[1, 2, 3], []])
+def test_decoding_a_crafted_cursor(values):
+    assert decode_cursor(encode_cursor(*values), int) is None
+    assert decode_cursor(encode_cursor(*values), str, int) is None
+
+
+@pytest.mark.parametrize('cursor', ['', 'not base64!', 'bnVsbA', 'e30'])
+def test_decoding_an_invalid_cursor(cursor):
+    assert decode_cursor(cursor, int) is None
+
+
+def create_tables(client, count):
+    for number in range(count):
+        client.post('/tables/add-table',
+                    json={'table_name': 'table' + 'abcdefghij'[number]})
+
+
+def test_paging_through_the_tables(login):
+    client = login(OWNER, 'owner')
+    create_tables(client, 3)
+    first = client.get('/tables/private-tables/?limit=2').get_json()
+    last = client.get('/tables/private-tables/?limit=2&after='
+                      + first['next_cursor']).get_json()
+
+    assert first['private_tables'] == ['tablea', 'tableb']
+    assert last == {'private_tables': ['tablec'], 'next_cursor': None}
+
+
+@pytest.mark.parametrize('values', CRAFTED_CURSORS)
+def test_crafted_cursor_gives_the_first_page_of_tables(login, values):
+    client = login(OWNER, 'owner')
+    create_tables(client, 3)
+    response = client.get('/tables/private-tables/?limit=2&after='
+                          + encode_cursor(*values))
+
+    assert response.status_code == 200
+    assert response.get_json()['private_tables'] == ['tablea', 'tableb']
+
+
+def create_tasks(client, count):
+    client.post('/tables/add-table', json={'table_name': 'board'})
+    client.post('/tables/board/add-column/', json={'column_name': 'todo'})
+
+    for number in range(count):
+        client.post('/tables/board/columns/todo/add-task/',
+                    json={'description': 'task {}'.format(number)})
+    return client.get('/tables/board').get_json()['columns'][0]['id']
+
+
+def tasks_url(column_id, query):
+    return '/tables/board/columns/{}/tasks/?{}'.format(column_id, query)
+
+
+def test_paging_through_the_tasks(login):
+    client = login(OWNER, 'owner')
+    column_id = create_tasks(client, 3)
+    first = client.get(tasks_url(column_id, 'limit=2')).get_json()
+    last = client.get(tasks_url(column_id, 'limit=2&after='
+                                + first['next_cursor'])).get_json()
+
+    assert [task['description'] for task in first['tasks'] + last['tasks']] \
+        == ['task 0', 'task 1', 'task 2']
+    assert last['next_cursor'] is None
+
+
+@pytest.mark.parametrize('values', CRAFTED_CURSORS)
+def test_crafted_cursor_gives_the_first_page_of_tasks(login, values):
+    client = login(OWNER, 'owner')
+    column_id = create_tasks(client, 3)
+    response = client.get(tasks_url(column_id,
+                                    'limit=2&after=' + encode_cursor(*values)))
+
+    assert response.status_code == 200
+    assert [task['description'] for task in response.get_json()['tasks']] \
+        == ['task 0', 'task 1']
@@ -0,0 +1,42 @@
+'''Searching the tasks of the user's tables, page by page.'''
+import pytest
+
+from pagination import encode_cursor
+
+OWNER = 'owner@example.com'
+
+
+def create_tasks(client, count):
+    client.post('/tables/add-table', json={'table_name': 'board'})
+    client.post('/tables/board/add-column/', json={'column_name': 'todo'})
+
+    for number in range(count):
+        client.post('/tables/board/columns/todo/add-task/',
+                    json={'description': 'write part {}'.format(number)})
+
+
+def search(client, query):
+    response = client.get('/tables/search/?q=write&' + query)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_paging_through_the_results(login):
+    client = login(OWNER, 'owner')
+    create_tasks(client, 3)
+    first = search(client, 'limit=2')
+    last = search(client, 'limit=2&after=' + first['next_cursor'])
+    found = [task['description'] for task in first['tasks'] + last['tasks']]
+
+    assert sorted(found) == ['write part 0', 'write part 1', 'write part 2']
+    assert last['next_cursor'] is None
+
+
+@pytest.mark.parametrize('values', [[{}, 1], [[1], 2], [1.5, '2'],
+                                    [True, 1], [1.5, 2 ** 63], [1.5]])
+def test_crafted_cursor_gives_the_first_page(login, values):
+    client = login(OWNER, 'owner')
+    create_tasks(client, 3)
+    first = search(client, 'limit=2')
+
+    assert search(client, 'limit=2&after=' + encode_cursor(*values)) == first
@@ -0,0 +1,67 @@
+'''The tables shared with a user are read with as many statements whatever
+the number of tables the user is a member of.'''
+from database import DATABASE
+from models.members import Members
+from models.tables import Tables
+from models.users import Users
+
+OWNER = 'owner@example.com'
+MEMBER = 'member@example.com'
+
+
+def share_tables(count):
+    '''Share count tables of OWNER with MEMBER, return their ids.'''
+    DATABASE.session.add_all([
+        Users(email=OWNER, username='owner', password_hash='-'),
+        Users(email=MEMBER, username='member', password_hash='-')])
+    tables = [Tables(name='table{}'.format(number), creator=OWNER,
+                     shared=True)
+              for number in range(count)]
+    DATABASE.session.add_all(tables)
+    DATABASE.session.flush()
+
+    for table in tables:
+        DATABASE.session.add_all([
+            Members(table_id=table.id, user_id=OWNER, role='creator'),
+            Members(table_id=table.id, user_id=MEMBER, role='visitor')])
+    DATABASE.session.commit()
+    return [table.id for table in tables]
+
+
+def unshare_tables():
+    '''Remove what share_tables() added.'''
+    DATABASE.session.query(Members).delete()
+    DATABASE.session.query(Tables).delete()
+    DATABASE.session.query(Users).delete()
+    DATABASE.session.commit()
+
+
+def list_shared_tables():
+    user = Users.query.get(MEMBER)
+    tables, _ = user.get_tables_shared_with_me()
+    return [(table.id, table.name, table.creator) for table in tables]
+
+
+def get_shared_table(table_id):
+    user = Users.query.get(MEMBER)
+    table, _ = user.get_table_by_id(table_id)
+    return (table.name, table.creator, table.shared)
+
+
+def test_listing_shared_tables(app, count_queries):
+    share_tables(1)
+    one = count_queries(list_shared_tables)
+    unshare_tables()
+
+    share_tables(20)
+    assert len(list_shared_tables()) == 20
+    assert count_queries(list_shared_tables) == one
+
+
+def test_getting_a_shared_table(app, count_queries):
+    first = share_tables(1)[0]
+    one = count_queries(get_shared_table, first)
+    unshare_tables()
+
+    last = share_tables(20)[-1]
+    assert count_queries(get_shared_table, last) == one
@@ -0,0 +1,82 @@
+'''Bounded in-process cache of the users loaded by flask_login.
+
+Every authenticated request loads its user. The cache keeps the column
+values of the users recently seen for a few seconds so that these loads
+don't query the database. Users are forgotten as soon as they are updated
+or deleted by this process, other processes see the change once their
+entry expires.'''
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class UserCache:
+    '''Least recently used users are evicted once the cache is full, users
+       are kept at most ttl seconds.'''
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        '''Read the time to live and the size from the application's
+           configuration.'''
+        self.ttl = app.config.get('USER_CACHE_TTL', DEFAULT_TTL)
+        self.max_entries = app.config.get('USER_CACHE_SIZE',
+                                          DEFAULT_MAX_ENTRIES)
+
+    def get(self, email):
+        '''Return the cached column values of the user, or None.'''
+        with self._lock:
+            entry = self._entries.get(email)
+
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, email, values):
+        '''Cache the column values of the user.'''
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries.pop(email, None)
+            self._entries[email] = (time.monotonic() + self.ttl, values)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, email):
+        '''Forget the user, called whenever it is updated or deleted.'''
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def clear(self):
+        '''Forget every user.'''
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        '''Return the cache counters.'''
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'max_entries': self.max_entries,
+                    'ttl': self.ttl,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
+
+
+USER_CACHE = UserCache()
@@ -1,4 +1,4 @@
-module Main exposing (main)
+port module Main exposing (main)
 
 import Browser
 import Browser.Navigation as Nav
@@ -141,9 +141,96 @@ decodeMember =
 
 decodeTable : Decoder Table
 decodeTable =
+    Decode.maybe (field "format" int)
+        |> Decode.andThen
+            (\format ->
+                case format of
+                    Nothing ->
+                        decodeFullTable
+
+                    Just 1 ->
+                        decodeCompactTable
+
+                    Just version ->
+                        Decode.fail ("Unknown board format " ++ String.fromInt version)
+            )
+
+
+decodeFullTable : Decoder Table
+decodeFullTable =
     map6 Table (field "id" int) (field "name" string) (field "creator" string) (field "columns" (nullable (list decodeColumn))) (field "members" (nullable (list decodeMember))) (field "current_user_role" string)
 
 
+
+-- Compact boards, asked for through the X-Board-Format header: the tasks
+-- and the members are sent as one list per field, the ids of their column
+-- and table left out, the members' emails and roles as indexes in the
+-- "emails" and "roles" lists
+
+
+decodeCompactTable : Decoder Table
+decodeCompactTable =
+    field "id" int
+        |> Decode.andThen
+            (\tableId ->
+                map6 Table
+                    (Decode.succeed tableId)
+                    (field "name" string)
+                    (field "creator" string)
+                    (field "columns" (nullable (list (decodeCompactColumn tableId))))
+                    (map Just (decodeCompactMembers tableId))
+                    (field "current_user_role" string)
+            )
+
+
+decodeCompactColumn : Int -> Decoder Column
+decodeCompactColumn tableId =
+    field "id" int
+        |> Decode.andThen
+            (\columnId ->
+                map4 Column
+                    (Decode.succeed columnId)
+                    (field "name" string)
+                    (Decode.succeed tableId)
+                    (field "tasks" (map Just (decodeCompactTasks columnId)))
+            )
+
+
+decodeCompactTasks : Int -> Decoder (List Task)
+decodeCompactTasks columnId =
+    map2 (List.map2 (\id description -> Task id description columnId))
+        (field "id" (list int))
+        (field "description" (list string))
+
+
+decodeCompactMembers : Int -> Decoder (List Member)
+decodeCompactMembers tableId =
+    map2 Tuple.pair (field "emails" (list string)) (field "roles" (list string))
+        |> Decode.andThen
+            (\( emails, roles ) ->
+                field "members"
+                    (map3 (List.map3 (\id email role -> Member id tableId email role))
+                        (field "id" (list int))
+                        (field "email" (list (decodeInterned emails)))
+                        (field "role" (list (decodeInterned roles)))
+                    )
+            )
+
+
+decodeInterned : List String -> Decoder String
+decodeInterned values =
+    int
+        |> Decode.andThen
+            (\index ->
+                case List.head (List.drop index values) of
+                    Just value ->
+                        Decode.succeed value
+
+                    Nothing ->
+                        Decode.fail ("No interned value at index " ++ String.fromInt index)
+            )
+
+
 decodeUser : Decoder User
 decodeUser =
     map2 User (field "useremail" string) (field "username" string)
@@ -179,6 +266,52 @@ getServerResponse chunk =
 
 
 
+-- Board Requests, asking for compact boards
+
+
+boardFormat : Http.Header
+boardFormat =
+    Http.header "X-Board-Format" "compact"
+
+
+getBoard : { url : String, expect : Http.Expect msg } -> Cmd msg
+getBoard request =
+    Http.request
+        { method = "GET"
+        , headers = [ boardFormat ]
+        , url = request.url
+        , body = Http.emptyBody
+        , expect = request.expect
+        , timeout = Nothing
+        , tracker = Nothing
+        }
+
+
+postBoard : { url : String, body : Http.Body, expect : Http.Expect msg } -> Cmd msg
+postBoard request =
+    Http.request
+        { method = "POST"
+        , headers = [ boardFormat ]
+        , url = request.url
+        , body = request.body
+        , expect = request.expect
+        , timeout = Nothing
+        , tracker = Nothing
+        }
+
+
+
+-- Board changes pushed by the server, see back/static/realtime.js: the
+-- board shown is watched, and reloaded whenever another change is made
+
+
+port watchBoard : String -> Cmd msg
+
+
+port boardChanged : (Int -> msg) -> Sub msg
+
+
+
 -- Drag Events Handlers
 
 
@@ -291,6 +424,8 @@ type Msg
     | SetMemberAsAdmin
     | SetMemberAsEditor
     | SetMemberAsVisitor
+    | BoardChanged Int
+    | GotChangedTable (Result Http.Error Table)
 
 
 
@@ -383,7 +518,7 @@ updatePrivateTables msg model =
 
         RenameTable ->
             ( model
-            , Http.post
+            , postBoard
                 { url =
                     "/tables/private-tables/"
                         ++ (case model.current_table of
@@ -414,7 +549,7 @@ updatePrivateTables msg model =
 
         ViewPrivateTable ->
             ( { model | application_state = State_ViewPrivateTable }
-            , Http.get
+            , getBoard
                 { url = Url.toString model.url
                 , expect = Http.expectJson GotTable decodeTable
                 }
@@ -486,7 +621,7 @@ updateTablesSharedWithOthers msg model =
 
         ViewTableSharedWithOthers ->
             ( { model | application_state = State_ViewTableSharedWithOthers }
-            , Http.get
+            , getBoard
                 { url = Url.toString model.url
                 , expect = Http.expectJson GotTable decodeTable
                 }
@@ -542,7 +677,7 @@ updateTablesSharedWithMe msg model =
 
         ViewTableSharedWithMe ->
             ( { model | application_state = State_ViewTableSharedWithMe }
-            , Http.get
+            , getBoard
                 { url = Url.toString model.url
                 , expect = Http.expectJson GotTable decodeTable
                 }
@@ -580,7 +715,7 @@ update msg model =
                 , input_field_column = ""
                 , input_field_task = ""
               }
-            , Cmd.none
+            , watchBoard table.name
             )
 
         GotTable (Err error) ->
@@ -613,12 +748,36 @@ update msg model =
                 _ ->
                     ( model, Cmd.none )
 
+        BoardChanged table_id ->
+            case model.current_table of
+                Just table ->
+                    if table.id == table_id then
+                        ( model
+                        , getBoard
+                            { url = "/tables/" ++ table.name
+                            , expect = Http.expectJson GotChangedTable decodeTable
+                            }
+                        )
+
+                    else
+                        ( model, Cmd.none )
+
+                Nothing ->
+                    ( model, Cmd.none )
+
+        -- Unlike GotTable, leaves what the user is typing alone
+        GotChangedTable (Ok table) ->
+            ( { model | current_table = Just table }, Cmd.none )
+
+        GotChangedTable (Err _) ->
+            ( model, Cmd.none )
+
         AddPrivateTable ->
             updatePrivateTables msg model
 
         AddColumn ->
             ( model
-            , Http.post
+            , postBoard
                 { url =
                     "/tables/"
                         ++ (case model.current_table of
@@ -636,7 +795,7 @@ update msg model =
 
         AddTask ->
             ( model
-            , Http.post
+            , postBoard
                 { url = Url.toString model.url
                 , body = Http.jsonBody <| Encode.object [ ( "description", Encode.string model.input_field_task ) ]
                 , expect = Http.expectJson GotTable decodeTable
@@ -645,7 +804,7 @@ update msg model =
 
         AddMember ->
             ( model
-            , Http.post
+            , postBoard
                 { url =
                     "/tables/"
                         ++ (case model.current_table of
@@ -681,7 +840,7 @@ update msg model =
 
         DeleteColumn ->
             ( model
-            , Http.get
+            , getBoard
                 { url = Url.toString model.url
                 , expect = Http.expectJson GotTable decodeTable
                 }
@@ -689,7 +848,7 @@ update msg model =
 
         DeleteTask ->
             ( model
-            , Http.get
+            , getBoard
                 { url = Url.toString model.url
                 , expect = Http.expectJson GotTable decodeTable
                 }
@@ -697,7 +856,7 @@ update msg model =
 
         DeleteMember ->
             ( { model | application_state = model.last_application_state }
-            , Http.post
+            , postBoard
                 { url =
                     "/tables/"
                         ++ (case model.current_table of
@@ -795,7 +954,7 @@ update msg model =
                     ( { model
                         | taskBeingDragged = Nothing
                       }
-                    , Http.post
+                    , postBoard
                         { url =
                             "/tables/"
                                 ++ (case model.current_table of
@@ -817,7 +976,7 @@ update msg model =
 
         SetMemberAsAdmin ->
             ( { model | application_state = model.last_application_state }
-            , Http.post
+            , postBoard
                 { url =
                     "/tables/"
                         ++ (case model.current_table of
@@ -835,7 +994,7 @@ update msg model =
 
         SetMemberAsEditor ->
             ( { model | application_state = model.last_application_state }
-            , Http.post
+            , postBoard
                 { url =
                     "/tables/"
                         ++ (case model.current_table of
@@ -853,7 +1012,7 @@ update msg model =
 
         SetMemberAsVisitor ->
             ( { model | application_state = model.last_application_state }
-            , Http.post
+            , postBoard
                 { url =
                     "/tables/"
                         ++ (case model.current_table of
@@ -1285,7 +1444,7 @@ main =
         { init = initialModel
         , view = view
         , update = update
-        , subscriptions = always Sub.none
+        , subscriptions = always (boardChanged BoardChanged)
         , onUrlChange = UrlChanged
         , onUrlRequest = LinkClicked
         }